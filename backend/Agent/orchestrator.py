@@ -16,10 +16,12 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from Tools.temporal_patterns      import detect_payday_pattern, detect_weekly_pattern, detect_seasonal_pattern
 from Tools.anomaly_detector       import detect_transaction_outliers, detect_spending_spikes, detect_new_merchants
-from Tools.subscription_hunter    import detect_recurring_charges, detect_price_creep, detect_subscription_overlap
+from Tools.subscription_hunter    import detect_recurring_charges, detect_price_creep_all, detect_subscription_overlap
 from Tools.behavioral_correlation import calculate_category_correlations
 from Tools.spending_impact        import fit_impact_model
 from Tools.financial_resilience   import run_financial_resilience
+from Tools.monthly_totals         import monthly_category_totals
+from Ingestion.normalizer         import ensure_datetime, category_in
 
 
 # tool requirements — hard constraints
@@ -32,6 +34,9 @@ TOOL_REQUIREMENTS = {
     "financial_resilience":   {"min_days": 90,  "min_categories": 3},
 }
 
+# tools that read monthly category totals — the pivot is built once for all of them
+PIVOT_TOOLS = {"correlation_engine", "spending_impact", "financial_resilience"}
+
 
 
 ####################################
@@ -46,12 +51,12 @@ def _compute_spending_metrics(df: pd.DataFrame) -> dict:
     if "amount" in df_spend.columns:
         df_spend["amount"] = df_spend["amount"].abs()
 
-    df_spend["date"] = pd.to_datetime(df_spend["date"])
+    df_spend["date"] = ensure_datetime(df_spend["date"])
     df_spend["month"] = df_spend["date"].dt.to_period("M")
 
     # Filter out income and transfers so totals reflect actual spending
     if "category" in df_spend.columns:
-        df_spend = df_spend[~df_spend["category"].fillna("").str.lower().isin(["income", "transfer", ""])]
+        df_spend = df_spend[~category_in(df_spend["category"], {"income", "transfer", ""})]
 
     total_spent = float(df_spend["amount"].sum())
 
@@ -119,9 +124,9 @@ def _compute_spending_metrics(df: pd.DataFrame) -> dict:
     if "category" in df.columns:
         df_all = df.copy()
         df_all["amount"] = df_all["amount"].abs()
-        df_all["date"] = pd.to_datetime(df_all["date"])
+        df_all["date"] = ensure_datetime(df_all["date"])
         df_all["month"] = df_all["date"].dt.to_period("M")
-        income_mask = df_all["category"].fillna("").str.lower() == "income"
+        income_mask = category_in(df_all["category"], {"income"})
         income_monthly = df_all[income_mask].groupby("month")["amount"].sum()
 
         if len(income_monthly) > 0:
@@ -160,7 +165,7 @@ def profile_data(df: pd.DataFrame) -> dict:
             "monthly_income": 0, "monthly_spending": 0, "savings_rate": 0,
         }
 
-    dates     = pd.to_datetime(df["date"])
+    dates     = ensure_datetime(df["date"])
     span_days = (dates.max() - dates.min()).days
 
     categories = []
@@ -170,7 +175,7 @@ def profile_data(df: pd.DataFrame) -> dict:
 
     has_income = False
     if "category" in df.columns:
-        has_income = df["category"].fillna("").str.lower().eq("income").any()
+        has_income = category_in(df["category"], {"income"}).any()
 
     profile = {
         "transaction_count": len(df),
@@ -258,8 +263,8 @@ def plan_analysis(profile: dict) -> dict:
 # STEP 3: EXECUTE PLAN
 ####################################
 
-def _run_tool(name: str, df: pd.DataFrame) -> tuple:
-    """Execute a single analysis tool. Returns (name, result)."""
+def _run_tool(name: str, df: pd.DataFrame, pivot: pd.DataFrame = None) -> tuple:
+    """Execute a single analysis tool. Returns (name, result). pivot = monthly category totals."""
 
     if name == "temporal_patterns":
         return name, {
@@ -279,18 +284,18 @@ def _run_tool(name: str, df: pd.DataFrame) -> tuple:
         recurring = detect_recurring_charges(df)
         return name, {
             "recurring":   recurring,
-            "price_creep": [detect_price_creep(df, r["merchant"]) for r in recurring],
+            "price_creep": detect_price_creep_all(df, recurring),
             "overlaps":    detect_subscription_overlap(recurring),
         }
 
     elif name == "correlation_engine":
-        return name, calculate_category_correlations(df)
+        return name, calculate_category_correlations(df, pivot)
 
     elif name == "spending_impact":
-        return name, fit_impact_model(df)
+        return name, fit_impact_model(df, pivot)
 
     elif name == "financial_resilience":
-        return name, run_financial_resilience(df)
+        return name, run_financial_resilience(df, pivot)
 
     return name, {}
 
@@ -304,6 +309,9 @@ def execute_analysis_plan(df: pd.DataFrame, plan: dict, on_progress=None) -> dic
     # drop uncategorized rows — NaN categories would skew every tool
     df = df[df["category"].notna() & (df["category"] != "")].copy()
 
+    # parse dates once here — every tool below gets datetime64 and skips its own parse
+    df["date"] = ensure_datetime(df["date"])
+
     results       = {}
     tools_run     = []
     tools_skipped = []
@@ -318,6 +326,15 @@ def execute_analysis_plan(df: pd.DataFrame, plan: dict, on_progress=None) -> dic
         else:
             enabled_tools.append(name)
 
+    # monthly category totals — built once here, read by every tool that needs them.
+    # if the build fails, each tool builds (or fails on) its own, like any other tool error
+    pivot = None
+    if PIVOT_TOOLS.intersection(enabled_tools):
+        try:
+            pivot = monthly_category_totals(df)
+        except Exception as e:
+            print(f"  Shared monthly totals failed: {e} — tools will build their own")
+
     emit("Running analysis tools...")
 
     # run all enabled tools in parallel — they're independent (read-only on df)
@@ -328,7 +345,7 @@ def execute_analysis_plan(df: pd.DataFrame, plan: dict, on_progress=None) -> dic
             label = TOOL_DISPLAY_NAMES.get(name, name)
             emit(label + "...")
             print(f"\nRunning: {name}...")
-            futures[executor.submit(_run_tool, name, df)] = name
+            futures[executor.submit(_run_tool, name, df, pivot)] = name
 
         for future in as_completed(futures):
             name = futures[future]
@@ -10,11 +10,13 @@ LLM fallback for merchants the rule engine cannot categorize
 Uses LLM/client.py — works with Ollama, Claude, OpenAI, or Gemini.
 """
 
+import os
 import json
-import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 
-from LLM.client import call_llm, extract_json
+from LLM.client import call_llm, call_llm_batch, extract_json
+from Categorization.constants import LLM_DEFAULT_CONFIDENCE
 
 
 CATEGORIES = [
@@ -24,7 +26,8 @@ CATEGORIES = [
     "Income", "Transfer", "Uncategorized",
 ]
 
-BATCH_SIZE = 10   # merchants per LLM call (keeps prompt focused)
+BATCH_SIZE      = 10   # merchants per LLM call (keeps prompt focused)
+MAX_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))   # in-flight LLM calls (provider rate limits)
 
 
 
@@ -32,9 +35,8 @@ BATCH_SIZE = 10   # merchants per LLM call (keeps prompt focused)
 # STEP 1: CLASSIFY ONE MERCHANT
 ####################################
 
-def categorize_with_llm(merchant: str) -> dict:
-
-    prompt = f"""Categorize this merchant into exactly one of: {', '.join(CATEGORIES)}
+def _single_prompt(merchant: str) -> str:
+    return f"""Categorize this merchant into exactly one of: {', '.join(CATEGORIES)}
 
         Merchant: {merchant}
 
@@ -42,8 +44,10 @@ def categorize_with_llm(merchant: str) -> dict:
         {{"category": "...", "confidence": 0.0-1.0, "reasoning": "one sentence"}}
         """
 
+
+def _parse_single(raw: str) -> dict:
+
     try:
-        raw    = call_llm(prompt, temperature=0.0, max_tokens=120)
         result = json.loads(extract_json(raw))
 
         if result.get("category") not in CATEGORIES:
@@ -56,6 +60,65 @@ def categorize_with_llm(merchant: str) -> dict:
         return {"category": "Uncategorized", "confidence": 0.0, "reasoning": str(e)}
 
 
+def categorize_with_llm(merchant: str) -> dict:
+
+    # provider errors / cost guard land here too — never raise out of the fallback path
+    try:
+        raw = call_llm(_single_prompt(merchant), temperature=0.0, max_tokens=120)
+    except Exception as e:
+        return {"category": "Uncategorized", "confidence": 0.0, "reasoning": str(e)}
+
+    return _parse_single(raw)
+
+
+def _parse_packed(raw) -> dict:
+    """
+    One call_llm_batch answer -> result dict, or None when the merchant needs its own call.
+
+      _parse_packed("Dining")                   -> {"category": "Dining", "confidence": 0.75, "reasoning": ""}
+      _parse_packed('{"category": "Dining"}')   -> {"category": "Dining"}
+      _parse_packed("Sure! Here you go")        -> None
+    """
+
+    if raw is None:
+        return None
+
+    # packed answers often come back as a bare category name
+    if raw in CATEGORIES:
+        return {"category": raw, "confidence": LLM_DEFAULT_CONFIDENCE, "reasoning": ""}
+
+    try:
+        result = json.loads(extract_json(raw))
+    except json.JSONDecodeError:
+        return None
+
+    return _parse_single(raw) if isinstance(result, dict) else None
+
+
+def _categorize_individually(merchants: list) -> list:
+    """
+    Fallback for merchants the list prompt missed — still one packed request
+    via call_llm_batch, with a per-merchant retry only where that fails too.
+    """
+
+    if not merchants:
+        return []
+
+    try:
+        raws = call_llm_batch([_single_prompt(m) for m in merchants], temperature=0.0, max_tokens=120)
+    except Exception as e:
+        print(f"Packed fallback failed: {e} — retrying one by one")
+        raws = [None] * len(merchants)
+
+    results = []
+    for m, raw in zip(merchants, raws):
+        r = _parse_packed(raw) or categorize_with_llm(m)
+        r["merchant"] = m
+        results.append(r)
+
+    return results
+
+
 
 ####################################
 # STEP 2: BATCH CLASSIFY (multi-merchant per call)
@@ -84,9 +147,12 @@ def _categorize_batch(merchants: list) -> list:
         # map by merchant name for lookup
         result_map = {item.get("merchant", "").upper(): item for item in parsed}
 
+        missing  = [m for m in merchants if m.upper() not in result_map]
+        fallback = {r["merchant"]: r for r in _categorize_individually(missing)}
+
         results = []
         for m in merchants:
-            r = result_map.get(m.upper()) or categorize_with_llm(m)
+            r = result_map.get(m.upper()) or fallback[m]
             if r.get("category") not in CATEGORIES:
                 r["category"]   = "Uncategorized"
                 r["confidence"] = 0.0
@@ -97,27 +163,25 @@ def _categorize_batch(merchants: list) -> list:
 
     except Exception as e:
         print(f"Batch failed: {e} — falling back to individual")
-        results = []
-        for m in merchants:
-            r = categorize_with_llm(m)
-            r["merchant"] = m
-            results.append(r)
-        return results
+        return _categorize_individually(merchants)
 
 
 def batch_categorize_llm(merchants: list) -> pd.DataFrame:
 
-    results = []
-    chunks  = [merchants[i:i+BATCH_SIZE] for i in range(0, len(merchants), BATCH_SIZE)]
+    # one LLM answer per distinct merchant — callers may pass repeats
+    merchants = list(dict.fromkeys(merchants))
+
+    chunks = [merchants[i:i+BATCH_SIZE] for i in range(0, len(merchants), BATCH_SIZE)]
+    if not chunks:
+        return pd.DataFrame(columns=["merchant", "category", "confidence"])
 
-    for chunk_idx, chunk in enumerate(chunks):
-        print(f"LLM batch {chunk_idx+1}/{len(chunks)} ({len(chunk)} merchants)...")
+    print(f"LLM batch: {len(merchants)} merchants in {len(chunks)} calls ({MAX_CONCURRENCY} in flight)...")
 
-        batch_results = _categorize_batch(chunk)
-        results.extend(batch_results)
+    # calls are network-bound — overlap round trips, the pool size is the rate limit
+    with ThreadPoolExecutor(max_workers=max(1, min(len(chunks), MAX_CONCURRENCY))) as executor:
+        batch_results = list(executor.map(_categorize_batch, chunks))
 
-        if chunk_idx < len(chunks) - 1:
-            time.sleep(0.3)
+    results = [r for batch in batch_results for r in batch]
 
     df = pd.DataFrame(results)
     print(f"LLM batch done — {len(df)} merchants classified")
@@ -83,7 +83,11 @@ def update_from_user_correction(merchant: str, correct_category: str, db_path: s
 ####################################
 
 def _save_db(db: dict, db_path: str):
+    # rewritten on every upload that learns a merchant — json.dumps with no
+    # indent takes the C encoder and a single write; json.dump(indent=2) is pure Python
+    payload = json.dumps(db, separators=(",", ":"))
+
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
     with FileLock(db_path + ".lock", timeout=5):
         with open(db_path, "w") as f:
-            json.dump(db, f, indent=2)
+            f.write(payload)
@@ -17,6 +17,8 @@ from Categorization.constants import RULE_EXACT_CONFIDENCE, RULE_WORD_CONFIDENCE
 
 
 _RULES_PATH = Path(__file__).parent / "rules.json"
+_PUNCT_RE   = re.compile(r"['\-\.]")
+_engine     = (None, None)      # (rules dict, compiled engine) — last rules compiled
 
 
 
@@ -28,7 +30,7 @@ def _normalize(s: str) -> str:
     """Strip punctuation that varies across bank formats before comparing.
     "LONGO'S" -> "LONGOS",  "WAL-MART" -> "WALMART",  "MR. SUB" -> "MR SUB"
     """
-    return re.sub(r"['\-\.]", "", s.upper())
+    return _PUNCT_RE.sub("", s.upper())
 
 
 def build_rule_engine(path=None) -> dict:
@@ -37,35 +39,80 @@ def build_rule_engine(path=None) -> dict:
         return json.load(f)
 
 
+def _compile_rules(rules: dict) -> tuple:
+    """
+    Normalize every keyword and compile its whole-word pattern once.
+    Returns (any_keyword_re, [(category, kw_norm, word_re), ...]) in rule order,
+    since the first keyword that hits decides the category.
+    """
+
+    compiled = []
+    for category, keywords in rules.items():
+        for kw in keywords:
+            kw_norm = _normalize(kw)
+            compiled.append((category, kw_norm, re.compile(r'\b' + re.escape(kw_norm) + r'\b')))
+
+    # one alternation scan rejects merchants that contain no keyword at all
+    any_keyword = re.compile("|".join(re.escape(kw_norm) for _, kw_norm, _ in compiled))
+
+    return any_keyword, compiled
+
+
+def _engine_for(rules: dict) -> tuple:
+    """
+    Compiled engine for rules, reused while callers keep passing the same dict.
+    Holding the dict itself (not its id) means a recycled id can never hit.
+    Rules are treated as read-only once loaded — build_rule_engine() for changes.
+    """
+
+    global _engine
+
+    cached_rules, engine = _engine
+    if cached_rules is not rules:
+        engine  = _compile_rules(rules)
+        _engine = (rules, engine)
+
+    return engine
+
+
 
 ####################################
 # STEP 2: CATEGORIZE ONE MERCHANT
 ####################################
 
-def categorize_merchant(merchant: str, rules: dict) -> tuple:
+def _match(merchant: str, engine: tuple) -> tuple:
 
-    m      = merchant.strip().upper()
-    m_norm = _normalize(m)
+    any_keyword, compiled = engine
 
-    for category, keywords in rules.items():
-        for kw in keywords:
-            kw_norm = _normalize(kw)
+    m_norm = _normalize(merchant.strip().upper())
 
-            # exact match
-            if m_norm == kw_norm:
-                return category, RULE_EXACT_CONFIDENCE
+    if not any_keyword.search(m_norm):
+        return None, 0.0
 
-            # whole-word match
-            if re.search(r'\b' + re.escape(kw_norm) + r'\b', m_norm):
-                return category, RULE_WORD_CONFIDENCE
+    # exact and whole-word matches are both substrings — test the cheap
+    # containment first, then grade the first keyword that is present
+    for category, kw_norm, word_re in compiled:
+        if kw_norm not in m_norm:
+            continue
 
-            # substring match
-            if kw_norm in m_norm:
-                return category, RULE_SUBSTRING_CONFIDENCE
+        # exact match
+        if m_norm == kw_norm:
+            return category, RULE_EXACT_CONFIDENCE
+
+        # whole-word match
+        if word_re.search(m_norm):
+            return category, RULE_WORD_CONFIDENCE
+
+        # substring match
+        return category, RULE_SUBSTRING_CONFIDENCE
 
     return None, 0.0
 
 
+def categorize_merchant(merchant: str, rules: dict) -> tuple:
+    return _match(merchant, _engine_for(rules))
+
+
 
 ####################################
 # STEP 3: BATCH CATEGORIZE
@@ -73,9 +120,14 @@ def categorize_merchant(merchant: str, rules: dict) -> tuple:
 
 def batch_categorize(merchants: list, rules: dict) -> pd.DataFrame:
 
+    engine = _engine_for(rules)
+
+    # transactions repeat merchants heavily — match each distinct name once
+    matches = {m: _match(m, engine) for m in dict.fromkeys(merchants)}
+
     results = []
     for merchant in merchants:
-        category, confidence = categorize_merchant(merchant, rules)
+        category, confidence = matches[merchant]
         results.append({
             "merchant":   merchant,
             "category":   category,
@@ -3,9 +3,14 @@ Clean merchant names and validate transaction data
 """
 
 import re
+import logging
+import numpy as np
 import pandas as pd
 
 
+log = logging.getLogger(__name__)
+
+
 # prefixes to strip from raw bank descriptions
 STRIP_PREFIXES = [
     r"^debit card purchase\s*-\s*",
@@ -75,7 +80,7 @@ def deduplicate_transactions(df: pd.DataFrame) -> pd.DataFrame:
 
     removed = before - len(df)
     if removed > 0:
-        print(f"Removed {removed} duplicate transactions")
+        log.info("Removed %d duplicate transactions", removed)
 
     return df.reset_index(drop=True)
 
@@ -87,16 +92,53 @@ def deduplicate_transactions(df: pd.DataFrame) -> pd.DataFrame:
 
 def validate_date_range(df: pd.DataFrame) -> tuple:
 
-    dates      = pd.to_datetime(df["date"])
+    dates      = ensure_datetime(df["date"])
     start_date = dates.min()
     end_date   = dates.max()
     span_days  = (end_date - start_date).days
 
     if span_days < 7:
-        print(f"Warning: Only {span_days} days of data — analysis may be limited")
+        log.warning("Only %d days of data — analysis may be limited", span_days)
 
-    print(f"Date range: {start_date.date()} → {end_date.date()} ({span_days} days)")
+    log.info("Date range: %s → %s (%d days)", start_date.date(), end_date.date(), span_days)
     return start_date, end_date
 
 
 
+####################################
+# STEP 4: ENSURE PARSED DATES
+####################################
+
+def ensure_datetime(dates: pd.Series) -> pd.Series:
+    """
+    Parse only when needed — ingestion already hands over datetime64, and
+    re-running to_datetime on it still costs a full pass per tool.
+
+      ensure_datetime(pd.Series(["2025-01-03"]))  -> datetime64 Series
+      ensure_datetime(already_parsed)             -> same Series, untouched
+    """
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    return pd.to_datetime(dates, cache=True)
+
+
+
+####################################
+# STEP 5: CATEGORY MASKS
+####################################
+
+def category_in(categories: pd.Series, names: set) -> pd.Series:
+    """
+    Case-insensitive category membership — same result as
+    categories.fillna("").str.lower().isin(names), but each distinct label is
+    lowercased once instead of every row.
+
+      category_in(df["category"], {"income", "transfer", ""})  -> bool Series aligned to df
+    """
+
+    codes, labels = pd.factorize(categories)   # NaN -> -1
+
+    # one slot per label, plus a trailing slot that code -1 (NaN -> "") lands on
+    hits = np.array([isinstance(label, str) and label.lower() in names for label in labels] + ["" in names], dtype=bool)
+
+    return pd.Series(hits[codes], index=categories.index)
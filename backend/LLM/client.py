@@ -13,11 +13,34 @@ Usage:
 """
 
 import os
-import re
 import json
 import time
+import logging
+import sqlite3
+import hashlib
+import threading
+import httpx
 import requests
 
+# provider SDKs are optional — import once at module load so the call path never pays for it
+try:
+    import anthropic
+except ImportError:
+    anthropic = None
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+
+log = logging.getLogger(__name__)
+
 
 SONNET_MODEL = "claude-sonnet-4-6"
 HAIKU_MODEL  = "claude-haiku-4-5-20251001"
@@ -34,11 +57,27 @@ PRICING = {
 COST_WARN  = 0.50
 COST_ABORT = 1.00
 
+# client-side request ceiling shared by all threads (0 = no limit)
+MAX_RPM = int(os.getenv("LLM_MAX_RPM", "0"))
+
+# deterministic (temperature 0) responses are cached on disk across runs — opt-in,
+# since prompts carry merchant names and the file has no size limit or TTL
+CACHE_ENABLED = os.getenv("LLM_CACHE", "false").lower() == "true"
+CACHE_PATH    = os.path.expanduser(os.getenv("LLM_CACHE_PATH", "~/.cache/sift_llm.sqlite"))
+
 _provider       = None
 _default_model  = None
 _clients        = {}            # provider -> reusable client instance
+_clients_lock   = threading.Lock()
+_call_fn        = None          # provider call resolved once at init
 _session_cost   = 0.0           # cumulative cost of session (dollars)
 _session_tokens = 0
+_cache_conn     = None          # sqlite connection, opened on first use
+_cache_lock     = threading.Lock()
+_init_lock      = threading.Lock()
+_usage_lock     = threading.Lock()  # callers may run call_llm from worker threads
+_rate_lock      = threading.Lock()
+_next_slot      = 0.0           # monotonic time the next request may go out
 
 
 
@@ -51,7 +90,7 @@ def initialize_llm_client(provider: str = None):
     Priority: LLM_PROVIDER env var > API key detection > ollama fallback.
     """
     
-    global _provider, _default_model
+    global _provider, _default_model, _call_fn
 
     if provider:
         os.environ["LLM_PROVIDER"] = provider
@@ -59,22 +98,24 @@ def initialize_llm_client(provider: str = None):
     explicit = os.getenv("LLM_PROVIDER", "").lower()
 
     if explicit == "claude" or (not explicit and os.getenv("ANTHROPIC_API_KEY")):
-        _provider = "claude"
         _default_model = os.getenv("CLAUDE_MODEL", "claude-haiku-4-5-20251001")
+        _provider = "claude"
 
     elif explicit == "openai" or (not explicit and os.getenv("OPENAI_API_KEY")):
-        _provider = "openai"
         _default_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        _provider = "openai"
 
     elif explicit == "gemini" or (not explicit and os.getenv("GEMINI_API_KEY")):
-        _provider = "gemini"
         _default_model = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+        _provider = "gemini"
 
     else:
-        _provider = "ollama"
         _default_model = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
+        _provider = "ollama"
 
-    print(f"LLM provider: {_provider} | model: {_default_model}")
+    _call_fn = _DISPATCH.get(_provider)
+
+    log.info("LLM provider: %s | model: %s", _provider, _default_model)
     return _provider
 
 
@@ -83,15 +124,53 @@ def initialize_llm_client(provider: str = None):
 # STEP 2: PROVIDER IMPLEMENTATIONS
 ####################################
 
-def _call_claude(prompt, model, temperature, max_tokens) -> str:
-    if "claude" not in _clients:
-        import anthropic
-        _clients["claude"] = anthropic.Anthropic(
-            api_key=os.environ["ANTHROPIC_API_KEY"],
-            timeout=30.0,
-        )
+def _get_client(name: str, factory):
+    """
+    Lazily build one shared client per provider.
+    Double-checked under a lock so concurrent first calls don't each open a connection pool.
+    """
+
+    client = _clients.get(name)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+
+def _make_claude():
+    if anthropic is None:
+        raise RuntimeError("Run: pip install anthropic")
+    return anthropic.Anthropic(api_key=os.environ["ANTHROPIC_API_KEY"], timeout=30.0)
+
+
+def _make_openai():
+    if openai is None:
+        raise RuntimeError("Run: pip install openai")
+    return openai.OpenAI(api_key=os.environ["OPENAI_API_KEY"])
 
-    response = _clients["claude"].messages.create(
+
+def _make_gemini():
+    if genai is None:
+        raise RuntimeError("Run: pip install google-generativeai")
+    genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+    return genai
+
+
+def _make_ollama():
+    # keep-alive pool — batched categorization fires many calls back to back
+    return httpx.Client(
+        base_url=os.getenv("OLLAMA_HOST", "http://localhost:11434"),
+        timeout=90.0,
+        limits=httpx.Limits(max_keepalive_connections=16),
+    )
+
+
+def _call_claude(prompt, model, temperature, max_tokens) -> str:
+    client   = _get_client("claude", _make_claude)
+    response = client.messages.create(
         model=model, max_tokens=max_tokens, temperature=temperature,
         messages=[{"role": "user", "content": prompt}],
     )
@@ -100,14 +179,8 @@ def _call_claude(prompt, model, temperature, max_tokens) -> str:
 
 
 def _call_openai(prompt, model, temperature, max_tokens) -> str:
-    if "openai" not in _clients:
-        try:
-            import openai
-        except ImportError:
-            raise RuntimeError("Run: pip install openai")
-        _clients["openai"] = openai.OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-
-    response = _clients["openai"].chat.completions.create(
+    client   = _get_client("openai", _make_openai)
+    response = client.chat.completions.create(
         model=model, max_tokens=max_tokens, temperature=temperature,
         messages=[{"role": "user", "content": prompt}],
     )
@@ -116,17 +189,10 @@ def _call_openai(prompt, model, temperature, max_tokens) -> str:
 
 
 def _call_gemini(prompt, model, temperature, max_tokens) -> str:
-    if "gemini" not in _clients:
-        try:
-            import google.generativeai as genai
-        except ImportError:
-            raise RuntimeError("Run: pip install google-generativeai")
-        genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-        _clients["gemini"] = genai
-
-    response = _clients["gemini"].GenerativeModel(model).generate_content(
+    client   = _get_client("gemini", _make_gemini)
+    response = client.GenerativeModel(model).generate_content(
         prompt,
-        generation_config=_clients["gemini"].types.GenerationConfig(
+        generation_config=client.types.GenerationConfig(
             temperature=temperature, max_output_tokens=max_tokens,
         ),
     )
@@ -142,18 +208,15 @@ def _call_gemini(prompt, model, temperature, max_tokens) -> str:
 
 
 def _call_ollama(prompt, model, temperature, max_tokens) -> str:
-    import httpx
-
-    base_url = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-    response = httpx.post(
-        f"{base_url}/api/chat",
+    client   = _get_client("ollama", _make_ollama)
+    response = client.post(
+        "/api/chat",
         json={
             "model":   model,
             "messages": [{"role": "user", "content": prompt}],
             "stream":  False,
             "options": {"temperature": temperature, "num_predict": max_tokens},
         },
-        timeout=90.0,
     )
     response.raise_for_status()
     return response.json()["message"]["content"].strip()
@@ -180,19 +243,78 @@ def _estimate_cost(input_tokens: int, output_tokens: int, model: str = None) ->
            (output_tokens / 1_000_000) * prices["output"]
 
 
+def _estimate_prompt_cost(prompt: str, model: str = None) -> float:
+    """Pre-flight input cost — ~4 chars per token is close enough for a budget guard."""
+    return _estimate_cost(len(prompt) // 4, 0, model)
+
+
 def _track_usage(input_tokens: int, output_tokens: int, model: str):
     """Track tokens and cost for this session."""
     global _session_cost, _session_tokens
     cost = _estimate_cost(input_tokens, output_tokens, model)
-    _session_cost += cost
-    _session_tokens += input_tokens + output_tokens
-    if _session_cost > COST_WARN:
-        print(f"Warning: Session LLM cost at ${_session_cost:.2f}")
+    with _usage_lock:
+        _session_cost += cost
+        _session_tokens += input_tokens + output_tokens
+        total = _session_cost
+    if total > COST_WARN:
+        log.warning("Session LLM cost at $%.2f", total)
 
 
 
 ####################################
-# STEP 4: UNIFIED CALL (with retry)
+# STEP 4: RESPONSE CACHE
+####################################
+
+def _cache_key(prompt: str, model: str, temperature: float, max_tokens: int) -> str:
+    raw = f"{_provider}|{model}|{temperature}|{max_tokens}|{prompt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_db():
+    """Open connection, or None once the cache path has proven unusable."""
+    global _cache_conn, CACHE_ENABLED
+
+    if _cache_conn is None:
+        try:
+            os.makedirs(os.path.dirname(CACHE_PATH) or ".", exist_ok=True)
+            conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+            conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, created REAL)")
+        except (sqlite3.Error, OSError) as e:
+            # turn the cache off for the session instead of retrying (and warning) on every call
+            log.warning("LLM cache disabled — can't open %s: %s", CACHE_PATH, e)
+            CACHE_ENABLED = False
+            return None
+        _cache_conn = conn
+
+    return _cache_conn
+
+
+def _cache_get(key: str):
+    """Cached response or None. A broken cache is a miss, never an error."""
+    try:
+        with _cache_lock:
+            db  = _cache_db()
+            row = db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone() if db else None
+        return row[0] if row else None
+    except (sqlite3.Error, OSError) as e:
+        log.warning("LLM cache read failed: %s", e)
+        return None
+
+
+def _cache_put(key: str, response: str):
+    try:
+        with _cache_lock:
+            db = _cache_db()
+            if db:
+                db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, response, time.time()))
+                db.commit()
+    except (sqlite3.Error, OSError) as e:
+        log.warning("LLM cache write failed: %s", e)
+
+
+
+####################################
+# STEP 5: UNIFIED CALL (with retry)
 ####################################
 
 def get_ip_address() -> str:
@@ -202,47 +324,146 @@ def get_ip_address() -> str:
         ip_address.raise_for_status()
         return ip_address.json().get("ip", "Unknown")
     except requests.RequestException as e:
-        print(f"Error retrieving IP address: {e}")
+        log.warning("Error retrieving IP address: %s", e)
         return "Unknown"
 
 
+def _wait_for_slot():
+    """
+    Space outgoing requests 60 / MAX_RPM seconds apart across every thread,
+    so concurrent callers stay under the provider's rate limit instead of
+    tripping 429s and burning retries.
+    """
+
+    global _next_slot
+
+    if MAX_RPM <= 0:
+        return
+
+    with _rate_lock:
+        now        = time.monotonic()
+        slot       = max(now, _next_slot)
+        _next_slot = slot + 60.0 / MAX_RPM
+
+    if slot > now:
+        time.sleep(slot - now)
+
+
 def call_llm(prompt: str, temperature: float = 0.0, max_tokens: int = 500, model: str = None) -> str:
 
     global _provider, _default_model
 
     if _provider is None:
-        initialize_llm_client()
+        with _init_lock:
+            if _provider is None:
+                initialize_llm_client()
 
-    if _session_cost > COST_ABORT:
-        raise RuntimeError(f"Session cost ${_session_cost:.2f} exceeded abort limit ${COST_ABORT}")
-
-    fn    = _DISPATCH.get(_provider)
+    fn    = _call_fn or _DISPATCH.get(_provider)
     model = model or _default_model
 
+    # only temperature 0 is safe to replay — sampled calls are meant to vary
+    cache_key = _cache_key(prompt, model, temperature, max_tokens) if CACHE_ENABLED and temperature == 0.0 else None
+    if cache_key:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+    # refuse before the round trip if this prompt alone would cross the limit
+    projected = _session_cost + _estimate_prompt_cost(prompt, model)
+    if projected > COST_ABORT:
+        raise RuntimeError(f"Session cost ${projected:.2f} would exceed abort limit ${COST_ABORT}")
+
     if not fn:
         raise ValueError(f"Unknown provider: {_provider}")
 
     for attempt in range(3):
         try:
-            return fn(prompt, model, temperature, max_tokens)
+            _wait_for_slot()
+            response = fn(prompt, model, temperature, max_tokens)
+            if cache_key and response:
+                _cache_put(cache_key, response)
+            return response
         except Exception as e:
             if attempt == 2:
-                print(f"LLM call failed after 3 attempts: {e}")
+                log.error("LLM call failed after 3 attempts: %s", e)
                 return None
             wait = 2 ** attempt
-            print(f"LLM error (attempt {attempt + 1}): {e} — retrying in {wait}s")
+            log.warning("LLM error (attempt %d): %s — retrying in %ds", attempt + 1, e, wait)
             time.sleep(wait)
 
 
 
 ####################################
-# STEP 5: JSON EXTRACTION
+# STEP 6: JSON EXTRACTION
 ####################################
 
+_CLOSERS       = {"[": "]", "{": "}"}
+
+
+def _strip_fence(raw: str) -> str:
+    """Body of the first ```json ... ``` block, or raw unchanged. Plain str.find, no regex."""
+
+    start = raw.find("```")
+    if start == -1:
+        return raw
+
+    body = start + 3
+    if raw.startswith("json", body):
+        body += 4
+
+    end = raw.find("```", body)
+    return raw[body:end].strip() if end != -1 else raw
+
+
+def _json_spans(s: str) -> list:
+    """
+    (start, end) of every balanced array/object in s, sorted by start.
+    One linear pass with a stack — brackets inside strings don't count, and a
+    mismatched closer (or a newline inside a string) abandons everything still open.
+    """
+
+    spans     = []
+    stack     = []        # (start index, expected closer)
+    in_string = False
+    escape    = False
+
+    for i, ch in enumerate(s):
+
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            elif ch == "\n":
+                # JSON strings can't hold a raw newline — that quote was prose
+                in_string = False
+                stack.clear()
+
+        # quotes only open a string inside a bracket — prose quotes are ignored
+        elif ch == '"' and stack:
+            in_string = True
+
+        elif ch in _CLOSERS:
+            stack.append((i, _CLOSERS[ch]))
+
+        elif (ch == "]" or ch == "}") and stack:
+            start, expected = stack.pop()
+            if ch != expected:
+                stack.clear()
+                continue
+            spans.append((start, i + 1))
+
+    # inner values close first — put them back in opening order
+    spans.sort()
+    return spans
+
+
 def extract_json(raw: str) -> str:
     """
     LLMs often wrap JSON in ```json ... ``` or add trailing text after the JSON.
-    Uses raw_decode to find the first valid JSON value and stop there.
+    Returns the first balanced array/object that parses, and stops there.
 
       extract_json('```json\\n{"a": 1}\\n```')        ->  '{"a": 1}'
       extract_json('[{...}]\\n\\nSome explanation.')   ->  '[{...}]'
@@ -253,22 +474,64 @@ def extract_json(raw: str) -> str:
     if not raw:
         return "{}"
 
-    # fenced code block — strip fence then fall through to raw_decode
-    match = re.search(r"```(?:json)?\s*([\s\S]*?)```", raw)
-    if match:
-        raw = match.group(1).strip()
+    raw = _strip_fence(raw)
 
     # find the first valid JSON value (array or object), ignore trailing text
-    decoder = json.JSONDecoder()
-    for i, ch in enumerate(raw):
-        if ch in ('[', '{'):
-            try:
-                _, end = decoder.raw_decode(raw, i)
-                return raw[i:end].strip()
-            except json.JSONDecodeError:
-                continue
+    for i, end in _json_spans(raw):
+        try:
+            json.loads(raw[i:end])
+            return raw[i:end].strip()
+        except json.JSONDecodeError:
+            continue
+        except RecursionError:
+            break       # nested too deep to parse — every inner span would retry it
 
     return raw.strip()
 
 
 
+####################################
+# STEP 7: BATCHED CALLS
+####################################
+
+def call_llm_batch(prompts: list, temperature: float = 0.0, max_tokens: int = 150,
+                   batch_size: int = 32, model: str = None) -> list:
+    """
+    Pack independent prompts into one request per batch — one round trip
+    and one shared preamble instead of len(prompts) calls.
+
+      call_llm_batch(["Categorize: NETFLIX", "Categorize: LOBLAWS"])
+      -> ['{"category": "Subscriptions", ...}', '{"category": "Groceries", ...}']
+
+    max_tokens is per prompt. Returns a list aligned with prompts; an entry
+    is None when the response for that batch could not be parsed.
+    """
+
+    results = []
+
+    for start in range(0, len(prompts), batch_size):
+        chunk    = prompts[start:start + batch_size]
+        numbered = "\n\n".join(f"{i+1}. {p}" for i, p in enumerate(chunk))
+
+        packed = f"""Answer each of the {len(chunk)} numbered tasks below independently.
+
+        {numbered}
+
+        Return a JSON array with exactly {len(chunk)} entries, one answer per task, in order.
+        No text outside the JSON array."""
+
+        raw = call_llm(packed, temperature=temperature, max_tokens=max_tokens * len(chunk), model=model)
+
+        try:
+            answers = json.loads(extract_json(raw))
+        except json.JSONDecodeError:
+            answers = None
+
+        # positions are meaningless if the count is off — treat the whole batch as failed
+        if not isinstance(answers, list) or len(answers) != len(chunk):
+            results.extend([None] * len(chunk))
+            continue
+
+        results.extend(a if isinstance(a, str) else json.dumps(a) for a in answers)
+
+    return results
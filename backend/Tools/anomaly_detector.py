@@ -8,7 +8,15 @@ Find transaction outliers, category spending spikes, and new merchants
   -> [{"category": "Dining", "recent_month_total": 890, "prior_avg": 420, "spike_pct": 112}]
 """
 
+import numpy as np
 import pandas as pd
+from operator import itemgetter
+
+from Ingestion.normalizer import ensure_datetime
+
+
+# categories that move money but aren't spending
+NON_SPENDING = frozenset({"income", "transfer"})
 
 
 
@@ -33,49 +41,85 @@ def detect_transaction_outliers(df: pd.DataFrame) -> list:
     if "category" not in df.columns:
         return results
 
-    for category, group in df.groupby("category"):
+    # sort once by category code — each category becomes a contiguous numpy slice,
+    # so per-category stats are plain array calls with no groupby dispatch
+    codes, categories = pd.factorize(df["category"], sort=True)   # NaN category -> -1
+    order   = np.argsort(codes, kind="stable")
+    codes   = codes[order]
+    amounts = df["amount"].to_numpy(dtype=float)[order]
+    starts  = np.flatnonzero(np.diff(codes, prepend=-2))   # codes are >= -1, so row 0 always starts
+    ends    = np.append(starts[1:], len(codes))
+
+    positions, cat_stats = [], []
+
+    for start, end in zip(starts, ends):
+        code = codes[start]
+        if code < 0:
+            continue
 
         # skip non-spending categories
-        if category and category.lower() in ["income", "transfer"]:
+        category = categories[code]
+        if category and str(category).lower() in NON_SPENDING:
+            continue
+
+        if end - start < 5:
             continue
 
-        cat_amounts = group["amount"].astype(float)
+        # NaN-skipping like the Series methods: NaN counts toward the size check only
+        cat_amounts = amounts[start:end]
+        missing     = np.isnan(cat_amounts)
+        present     = cat_amounts[~missing]
 
-        if len(cat_amounts) < 5:
+        if present.size == 0:
             continue
 
-        q1  = cat_amounts.quantile(0.25)
-        q3  = cat_amounts.quantile(0.75)
-        iqr = q3 - q1
+        q1, q3 = np.quantile(present, [0.25, 0.75])
+        iqr    = q3 - q1
 
         if iqr == 0:
             continue
 
         # 2.0x IQR = stricter threshold — flags truly unusual, not just above-average
         upper_fence = q3 + 2.0 * iqr
-        median      = cat_amounts.median()
-        outlier_mask = cat_amounts > upper_fence
-        outliers     = group[outlier_mask]
+        is_outlier  = cat_amounts > upper_fence
 
-        for idx, row in outliers.iterrows():
-            amount = float(row["amount"])
-            # how many IQRs above Q3 (analogous to z-score but robust)
-            iqr_score = round((amount - q3) / iqr, 1)
+        if not is_outlier.any():
+            continue
 
-            results.append({
-                "merchant":        row.get("merchant", "Unknown"),
-                "amount":          round(amount, 2),
-                "date":            str(row.get("date", "")),
-                "category":        category,
-                "category_median": round(float(median), 2),
-                "category_avg":    round(float(cat_amounts.mean()), 2),
-                "upper_fence":     round(float(upper_fence), 2),
-                "iqr_score":       iqr_score,
-                "confidence":      "HIGH" if iqr_score >= 3.0 else "MEDIUM",
-            })
+        # zero-filled sum / present count — the exact arithmetic Series.mean() does
+        stats = {
+            "category":        category,
+            "q3":              q3,
+            "iqr":             iqr,
+            "category_median": round(float(np.median(present)), 2),
+            "category_avg":    round(float(np.where(missing, 0.0, cat_amounts).sum() / present.size), 2),
+            "upper_fence":     round(float(upper_fence), 2),
+        }
+
+        hits = order[start:end][is_outlier]
+        positions.extend(hits)
+        cat_stats.extend([stats] * len(hits))
+
+    # category ascending, then original row order within each — same as the groupby walk
+    for row, cat in zip(df.iloc[positions].to_dict(orient="records"), cat_stats):
+        amount = float(row["amount"])
+        # how many IQRs above Q3 (analogous to z-score but robust)
+        iqr_score = round((amount - cat["q3"]) / cat["iqr"], 1)
+
+        results.append({
+            "merchant":        row.get("merchant", "Unknown"),
+            "amount":          round(amount, 2),
+            "date":            str(row.get("date", "")),
+            "category":        cat["category"],
+            "category_median": cat["category_median"],
+            "category_avg":    cat["category_avg"],
+            "upper_fence":     cat["upper_fence"],
+            "iqr_score":       iqr_score,
+            "confidence":      "HIGH" if iqr_score >= 3.0 else "MEDIUM",
+        })
 
     # sort by iqr_score descending (most unusual first)
-    results.sort(key=lambda x: x["iqr_score"], reverse=True)
+    results.sort(key=itemgetter("iqr_score"), reverse=True)
 
     return results
 
@@ -97,7 +141,7 @@ def detect_spending_spikes(df: pd.DataFrame) -> list:
     if "category" not in df.columns:
         return results
 
-    dates = pd.to_datetime(df["date"])
+    dates = ensure_datetime(df["date"])
 
     # need at least 2 months
     span_days = (dates.max() - dates.min()).days
@@ -106,23 +150,29 @@ def detect_spending_spikes(df: pd.DataFrame) -> list:
 
 
     # most recent complete month
-    latest_month = dates.dt.to_period("M").max()
+    months       = dates.dt.to_period("M").rename("month")
+    latest_month = months.max()
 
-    for category, group in df.groupby("category"):
+    # every category x month total in one groupby — rows come out sorted by
+    # category, months ascending within each, so every category is one slice
+    monthly    = df.groupby([df["category"], months])["amount"].sum()
+    totals     = monthly.to_numpy(dtype=float)
+    categories = monthly.index.get_level_values("category")
+    starts     = np.flatnonzero(~categories.duplicated())
+    ends       = np.append(starts[1:], len(totals))
 
-        if category and category.lower() in ["income", "transfer"]:
-            continue
+    for category, start, end in zip(categories[starts], starts, ends):
 
-        group_dates = group["date"]
-        monthly     = group.groupby(group_dates.dt.to_period("M"))["amount"].sum()
+        if category and category.lower() in NON_SPENDING:
+            continue
 
-        if len(monthly) < 2:
+        if end - start < 2:
             continue
 
-        recent = float(monthly.iloc[-1])
+        recent = float(totals[end - 1])
 
         # average of everything except the most recent month
-        prior_avg = float(monthly.iloc[:-1].mean())
+        prior_avg = float(totals[start:end - 1].mean())
 
         if prior_avg == 0:
             continue
@@ -136,10 +186,10 @@ def detect_spending_spikes(df: pd.DataFrame) -> list:
                 "recent_month_total": round(recent, 2),
                 "prior_avg":          round(prior_avg, 2),
                 "spike_pct":          round(spike_pct, 1),
-                "months_compared":    len(monthly) - 1,
+                "months_compared":    int(end - start - 1),
             })
 
-    results.sort(key=lambda x: x["spike_pct"], reverse=True)
+    results.sort(key=itemgetter("spike_pct"), reverse=True)
 
     return results
 
@@ -159,29 +209,45 @@ def detect_new_merchants(df: pd.DataFrame, lookback_days: int = 30) -> list:
     """
 
     results = []
-    dates   = pd.to_datetime(df["date"])
+    dates   = ensure_datetime(df["date"])
     cutoff  = dates.max() - pd.Timedelta(days=lookback_days)
 
     # overall median for "high-value" threshold
-    overall_median = float(df["amount"].median()) if len(df) > 0 else 50
+    # median straight off the float array — nanmedian keeps Series.median's NaN skipping
+    amounts        = df["amount"].to_numpy(dtype=float)
+    overall_median = float(np.nanmedian(amounts)) if amounts.size > 0 else 50
     high_value_threshold = max(overall_median * 3, 50)  # at least $50
 
     # first appearance date per merchant
-    first_seen = df.groupby("merchant").agg(
-        first_date  = ("date", "min"),
-        count       = ("date", "count"),
-        avg_amount  = ("amount", "mean"),
-        max_amount  = ("amount", "max"),
-    )
+    # one integer sort by merchant code, then every stat is a reduceat over the group slices
+    codes, names = pd.factorize(df["merchant"], sort=True)   # NaN merchants -> -1
+    known        = codes >= 0
+
+    if not known.any():
+        return results
 
-    first_seen["first_date"] = pd.to_datetime(first_seen["first_date"])
+    order    = np.argsort(codes[known], kind="stable")
+    codes    = codes[known][order]
+    m_dates  = dates.to_numpy()[known][order]
+    m_amount = amounts[known][order]
+
+    starts   = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+
+    # NaN/NaT-skipping like groupby: fmin/fmax ignore missing, the count skips NaT
+    first_seen = pd.DataFrame({
+        "first_date": np.fmin.reduceat(m_dates, starts),
+        "count":      np.add.reduceat(~np.isnat(m_dates), starts),
+        "max_amount": np.fmax.reduceat(m_amount, starts),
+    }, index=pd.Index(names[codes[starts]], name="merchant"))
 
     # mode 1: repeated new merchants (potential new subscriptions)
-    repeated_new = first_seen[
-        (first_seen["first_date"] >= cutoff) &
-        (first_seen["count"] >= 2) &
-        (first_seen["avg_amount"] >= 5)
-    ]
+    # the mean comes from groupby over just these few merchants — its compensated
+    # sum keeps both the $5 cut and the rounded cents identical to a full groupby
+    repeated_new = first_seen[(first_seen["first_date"] >= cutoff) & (first_seen["count"] >= 2)]
+    is_repeat    = df["merchant"].isin(repeated_new.index)
+    avg_amounts  = df.loc[is_repeat, "amount"].groupby(df.loc[is_repeat, "merchant"]).mean()
+    repeated_new = repeated_new.assign(avg_amount=avg_amounts.reindex(repeated_new.index))
+    repeated_new = repeated_new[repeated_new["avg_amount"] >= 5]
 
     # mode 2: high-value one-time charges from unknown merchants
     one_time_high = first_seen[
@@ -190,41 +256,65 @@ def detect_new_merchants(df: pd.DataFrame, lookback_days: int = 30) -> list:
         (first_seen["max_amount"] >= high_value_threshold)
     ]
 
-    for merchant, row in repeated_new.iterrows():
-
-        # check if it looks recurring (monthly-ish interval)
-        merchant_dates = pd.to_datetime(df[df["merchant"] == merchant]["date"]).sort_values()
-        recurrence     = "one-time"
-
-        if len(merchant_dates) >= 2:
-            gaps = merchant_dates.diff().dt.days.dropna()
-            avg_gap = gaps.mean()
+    # first-row category per merchant (same row df[df.merchant == m].iloc[0] would pick)
+    has_category   = "category" in df.columns
+    first_category = df.drop_duplicates("merchant").set_index("merchant")["category"] if has_category else None
+
+    # gaps between visits for every repeated new merchant in one sorted pass
+    # instead of a full-frame scan per merchant
+    is_candidate = df["merchant"].isin(repeated_new.index)
+    visits       = pd.DataFrame({"merchant": df.loc[is_candidate, "merchant"], "date": dates[is_candidate]})
+    visits       = visits.sort_values(["merchant", "date"])
+    gap_days     = visits.groupby("merchant")["date"].diff().dt.days
+    avg_gaps     = gap_days.groupby(visits["merchant"]).mean()
+
+    # check if it looks recurring (monthly-ish interval) — every merchant labelled in one call
+    recurrences = pd.Series(
+        np.select(
+            [avg_gaps.between(25, 35), avg_gaps.between(6, 8)],
+            ["monthly", "weekly"],
+            default="one-time",
+        ),
+        index=avg_gaps.index,
+    )
 
-            if 25 <= avg_gap <= 35:
-                recurrence = "monthly"
-            elif 6 <= avg_gap <= 8:
-                recurrence = "weekly"
+    # plain column values instead of iterrows — no Series boxed per output row,
+    # rounding stays Python round() so half-cent results don't shift
+    repeated_rows = zip(
+        repeated_new.index,
+        repeated_new["first_date"].dt.strftime("%Y-%m-%d"),
+        repeated_new["count"].tolist(),
+        repeated_new["avg_amount"].tolist(),
+        recurrences.reindex(repeated_new.index).tolist(),
+    )
 
-        cat = df[df["merchant"] == merchant]["category"].iloc[0] if "category" in df.columns else "Unknown"
+    for merchant, first_seen_day, count, avg_amount, recurrence in repeated_rows:
+        cat = first_category[merchant] if has_category else "Unknown"
 
         results.append({
             "merchant":   merchant,
             "category":   cat,
-            "first_seen": str(row["first_date"].date()) if hasattr(row["first_date"], "date") else str(row["first_date"]),
-            "occurrences": int(row["count"]),
-            "avg_amount":  round(float(row["avg_amount"]), 2),
+            "first_seen": first_seen_day,
+            "occurrences": int(count),
+            "avg_amount":  round(avg_amount, 2),
             "recurrence":  recurrence,
         })
 
-    for merchant, row in one_time_high.iterrows():
-        cat = df[df["merchant"] == merchant]["category"].iloc[0] if "category" in df.columns else "Unknown"
+    one_time_rows = zip(
+        one_time_high.index,
+        one_time_high["first_date"].dt.strftime("%Y-%m-%d"),
+        one_time_high["max_amount"].tolist(),
+    )
+
+    for merchant, first_seen_day, max_amount in one_time_rows:
+        cat = first_category[merchant] if has_category else "Unknown"
 
         results.append({
             "merchant":    merchant,
             "category":    cat,
-            "first_seen":  str(row["first_date"].date()) if hasattr(row["first_date"], "date") else str(row["first_date"]),
+            "first_seen":  first_seen_day,
             "occurrences": 1,
-            "avg_amount":  round(float(row["max_amount"]), 2),
+            "avg_amount":  round(max_amount, 2),
             "recurrence":  "one-time",
             "high_value":  True,
         })
@@ -12,7 +12,8 @@ comparisons while remaining practical for typical consumer datasets
 import pandas as pd
 import numpy as np
 from scipy import stats
-from statsmodels.stats.multitest import multipletests
+
+from Tools.monthly_totals import monthly_category_totals
 
 
 
@@ -20,11 +21,32 @@ from statsmodels.stats.multitest import multipletests
 # STEP 1: CATEGORY CORRELATIONS
 ####################################
 
-def calculate_category_correlations(df: pd.DataFrame) -> list:
+def _benjamini_hochberg(p_values, alpha: float = 0.10) -> tuple:
+    """
+    BH step-up FDR — same (reject, adjusted) as statsmodels multipletests(method="fdr_bh")
+    for the <=91 pairs this sees, without importing statsmodels.
+
+      _benjamini_hochberg([0.01, 0.04, 0.03]) -> ([True, True, True], [0.03, 0.04, 0.04])
+    """
+
+    p     = np.asarray(p_values, dtype=float)
+    n     = len(p)
+    order = np.argsort(p)
+
+    # p_(k) / (k / n), then running min from the largest rank down keeps it monotone
+    ranked   = p[order] / (np.arange(1, n + 1) / n)
+    adjusted = np.empty(n)
+    adjusted[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+
+    return adjusted <= alpha, adjusted
+
+
+def calculate_category_correlations(df: pd.DataFrame, pivot: pd.DataFrame = None) -> list:
     """
     Monthly totals per category -> Pearson correlation matrix -> BH FDR corrected
 
     Only report: |r| >= 0.4 AND FDR-adjusted p < 0.10
+    pivot: monthly_category_totals(df) if the caller already built it
     """
 
     dates = df["date"]
@@ -34,19 +56,9 @@ def calculate_category_correlations(df: pd.DataFrame) -> list:
     if span_days < 90:
         return []
 
-    # skip non-spending
-    spend_df = df[~df["category"].fillna("").str.lower().isin(["income", "transfer", ""])].copy()
-    spend_df["month"] = spend_df["date"].dt.to_period("M")
-
-
-    # monthly totals per category
-    pivot = spend_df.pivot_table(
-        index   = "month",
-        columns = "category",
-        values  = "amount",
-        aggfunc = "sum",
-        fill_value = 0,
-    )
+    # monthly totals per category (the orchestrator passes one shared build)
+    if pivot is None:
+        pivot = monthly_category_totals(df)
 
     # need at least 3 categories with data
     categories = [c for c in pivot.columns if pivot[c].sum() > 0]
@@ -57,24 +69,34 @@ def calculate_category_correlations(df: pd.DataFrame) -> list:
 
 
     # compute all pairwise correlations
-    pairs     = []
-    n_pairs   = len(categories) * (len(categories) - 1) // 2
-
-    for i in range(len(categories)):
-        for j in range(i + 1, len(categories)):
-
-            cat_a = categories[i]
-            cat_b = categories[j]
-
-            a = pivot[cat_a].values.astype(float)
-            b = pivot[cat_b].values.astype(float)
-
-            # skip if either is constant or near-constant (no meaningful variance)
-            if np.std(a, ddof=1) < 1e-10 or np.std(b, ddof=1) < 1e-10:
-                continue
-
-            r, p_value = stats.pearsonr(a, b)
-            pairs.append((cat_a, cat_b, r, p_value))
+    n_pairs = len(categories) * (len(categories) - 1) // 2
+
+    # skip constant or near-constant columns (no meaningful variance)
+    X      = pivot[categories].to_numpy(dtype=float)
+    varied = X.std(axis=0, ddof=1) >= 1e-10
+    cols   = [c for c, keep in zip(categories, varied) if keep]
+
+    # whole correlation matrix in one call instead of pearsonr per pair
+    pairs = []
+    if len(cols) >= 2:
+        R    = np.corrcoef(X[:, varied], rowvar=False)
+        i, j = np.triu_indices(len(cols), k=1)
+        r    = np.clip(R[i, j], -1.0, 1.0)
+
+        # two-sided p from t = r * sqrt(df / (1 - r^2)), df = n - 2 — same test pearsonr runs
+        dof = n_months - 2
+        if dof > 0:
+            # one buffer reused through every step instead of a temporary per operator
+            t  = 1.0 - r * r
+            with np.errstate(divide="ignore"):
+                np.divide(dof, t, out=t)
+            np.sqrt(t, out=t)
+            t *= np.abs(r)
+            p_values = 2 * stats.t.sf(t, dof)
+        else:
+            p_values = np.ones_like(r)
+
+        pairs = [(cols[a], cols[b], r_ab, p_ab) for a, b, r_ab, p_ab in zip(i, j, r, p_values)]
 
     if not pairs:
         print(f"Found 0 significant correlations out of {n_pairs} pairs")
@@ -82,7 +104,7 @@ def calculate_category_correlations(df: pd.DataFrame) -> list:
 
     # Benjamini-Hochberg FDR correction (less conservative than Bonferroni)
     raw_pvals = [p for _, _, _, p in pairs]
-    reject, adjusted_pvals, _, _ = multipletests(raw_pvals, alpha=0.10, method="fdr_bh")
+    reject, adjusted_pvals = _benjamini_hochberg(raw_pvals, alpha=0.10)
 
     # filter: |r| >= 0.4 AND FDR-adjusted p < 0.10
     results = []
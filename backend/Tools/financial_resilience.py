@@ -11,8 +11,8 @@ import pandas as pd
 from Tools.simulator import stress_test as run_stress_test, calculate_runway
 
 
-def run_financial_resilience(df: pd.DataFrame) -> dict:
+def run_financial_resilience(df: pd.DataFrame, pivot: pd.DataFrame = None) -> dict:
     return {
-        "stress_test": run_stress_test(df, "job_loss"),
+        "stress_test": run_stress_test(df, "job_loss", pivot),
         "runway":      calculate_runway(df),
     }
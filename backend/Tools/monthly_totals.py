@@ -0,0 +1,28 @@
+"""
+Monthly spending per category — shared by correlation, spending impact, and the simulator
+
+  monthly_category_totals(df)
+  -> DataFrame indexed by month (Period), one zero-filled column per spending category
+
+The orchestrator builds this once per analysis run and passes it to each tool;
+a tool called on its own builds it from df.
+"""
+
+import pandas as pd
+
+from Ingestion.normalizer import ensure_datetime, category_in
+
+
+
+####################################
+# STEP 1: BUILD PIVOT
+####################################
+
+def monthly_category_totals(df: pd.DataFrame) -> pd.DataFrame:
+
+    # skip non-spending
+    spend_df = df[~category_in(df["category"], {"income", "transfer", ""})]
+    months   = ensure_datetime(spend_df["date"]).dt.to_period("M").rename("month")
+
+    # groupby + unstack == pivot_table(aggfunc="sum", fill_value=0) without its overhead
+    return spend_df.groupby([months, "category"])["amount"].sum().unstack(fill_value=0)
@@ -17,9 +17,13 @@ import numpy as np
 import pandas as pd
 
 from Categorization.constants import ESSENTIAL_CATEGORIES, DISCRETIONARY_CATEGORIES
+from Tools.monthly_totals     import monthly_category_totals
+from Ingestion.normalizer     import ensure_datetime, category_in
 
 
-N_SIMS = 1000
+N_SIMS       = 1000
+RUNWAY_BLOCK = 6        # months simulated per step of the runway stress test
+POOL_SIGMAS  = 5        # P(draw < 0) ~ 3e-7 — clipping these categories changes nothing
 
 
 
@@ -27,28 +31,35 @@ N_SIMS = 1000
 # STEP 1: BUILD DISTRIBUTIONS
 ####################################
 
-def _build_distributions(df: pd.DataFrame) -> dict:
+def _category_masks(df: pd.DataFrame) -> tuple:
+    """
+    (income_mask, spend_mask) — matched per distinct category label,
+    not per row, so no lowercase copy of the column is built.
+    """
+
+    return category_in(df["category"], {"income"}), ~category_in(df["category"], {"income", "transfer", ""})
+
+
+def _build_distributions(df: pd.DataFrame, pivot: pd.DataFrame = None) -> dict:
     """
     Per-category Normal(mean, std) from monthly spending history.
     Returns {category: {"mean": float, "std": float}}
     """
 
-    spend_df = df[~df["category"].fillna("").str.lower().isin(["income", "transfer", ""])].copy()
-    spend_df["month"] = pd.to_datetime(spend_df["date"]).dt.to_period("M")
-
-    pivot = spend_df.pivot_table(
-        index="month", columns="category", values="amount",
-        aggfunc="sum", fill_value=0,
-    )
+    if pivot is None:
+        pivot = monthly_category_totals(df)
 
-    distributions = {}
-    for cat in pivot.columns:
-        mean = float(pivot[cat].mean())
-        std  = float(pivot[cat].std()) if len(pivot) > 1 else mean * 0.15
-        if mean > 0:
-            distributions[cat] = {"mean": mean, "std": max(std, 1.0)}
+    # one row per category, contiguous — row-wise reductions then sum in the
+    # same order Series.mean()/std() do, so every value matches the per-column calls
+    X     = np.ascontiguousarray(pivot.to_numpy(dtype=float).T)
+    means = X.mean(axis=1)
+    stds  = X.std(axis=1, ddof=1) if len(pivot) > 1 else means * 0.15
 
-    return distributions
+    return {
+        cat: {"mean": mean, "std": max(std, 1.0)}
+        for cat, mean, std in zip(pivot.columns, means.tolist(), stds.tolist())
+        if mean > 0
+    }
 
 
 
@@ -59,16 +70,30 @@ def _build_distributions(df: pd.DataFrame) -> dict:
 def _simulate(distributions: dict, months: int) -> np.ndarray:
     """
     Sample monthly spending from per-category distributions.
-    Returns (N_SIMS, months) array of total monthly spending.
+    Returns (N_SIMS, months) float32 array of total monthly spending.
     """
 
-    totals = np.zeros((N_SIMS, months))
+    # float32 throughout — half the memory traffic, and cents-level quantiles
+    # don't need more than float32's ~7 significant digits
+    means = np.array([params["mean"] for params in distributions.values()], dtype=np.float32)
+    stds  = np.array([params["std"] for params in distributions.values()], dtype=np.float32)
+
+    # categories at least POOL_SIGMAS stds above zero essentially never hit the clip below,
+    # so they're drawn as one pooled Normal — a sum of Normals is Normal with the variances added
+    pooled = means >= POOL_SIGMAS * stds
+    if pooled.sum() > 1:
+        means = np.append(means[~pooled], means[pooled].sum())
+        stds  = np.append(stds[~pooled], np.sqrt((stds[pooled] ** 2).sum()))
 
-    for params in distributions.values():
-        samples = np.random.normal(params["mean"], params["std"], (N_SIMS, months))
-        totals += np.clip(samples, 0, None)
+    # one draw for every category at once — (N_SIMS, months, K), scaled and clipped in place
+    # SFC64 outruns the default PCG64 on bulk draws; a fresh generator per call keeps threads independent
+    rng      = np.random.Generator(np.random.SFC64())
+    samples  = rng.standard_normal((N_SIMS, months, len(means)), dtype=np.float32)
+    samples *= stds
+    samples += means
+    np.maximum(samples, 0, out=samples)
 
-    return totals
+    return samples.sum(axis=2)
 
 
 
@@ -76,7 +101,7 @@ def _simulate(distributions: dict, months: int) -> np.ndarray:
 # STEP 3: RUN PROJECTION
 ####################################
 
-def run_projection(df: pd.DataFrame, months: int = 12, scenario: dict = None) -> dict:
+def run_projection(df: pd.DataFrame, months: int = 12, scenario: dict = None, pivot: pd.DataFrame = None) -> dict:
     """
     Project spending forward with Monte Carlo.
 
@@ -84,18 +109,18 @@ def run_projection(df: pd.DataFrame, months: int = 12, scenario: dict = None) ->
       -> {"monthly": [{"month": 1, "spend_p50": 2100, "net_p50": 420}], "baseline": {...}}
 
     scenario: None | {"type": "job_loss"} | {"type": "expense_increase", "category": ..., "multiplier": ...} | {"type": "subscription_purge"}
+    pivot:    monthly_category_totals(df) if the caller already built it
     """
 
-    distributions = _build_distributions(df)
+    distributions = _build_distributions(df, pivot)
 
     if not distributions:
         return {"error": "Not enough spending data"}
 
-    # monthly income average
-    income_mask = df["category"].fillna("").str.lower() == "income"
-    income_df   = df[income_mask].copy()
-    income_df["month"] = pd.to_datetime(income_df["date"]).dt.to_period("M")
-    monthly_income = float(income_df.groupby("month")["amount"].sum().mean()) if not income_df.empty else 0.0
+    # monthly income average — filter just the two columns used, no copy of the whole frame
+    income_mask, _ = _category_masks(df)
+    income_months  = ensure_datetime(df["date"][income_mask]).dt.to_period("M")
+    monthly_income = float(df["amount"][income_mask].groupby(income_months).sum().mean()) if income_mask.any() else 0.0
 
     # copy distributions so we can modify without affecting caller
     dists            = {k: dict(v) for k, v in distributions.items()}
@@ -119,14 +144,18 @@ def run_projection(df: pd.DataFrame, months: int = 12, scenario: dict = None) ->
     totals = _simulate(dists, months)  # (N_SIMS, months)
     nets   = effective_income - totals
 
+    # every month's percentiles in one call per tensor instead of 4 per month
+    spend_p10, spend_p50, spend_p90 = np.percentile(totals, [10, 50, 90], axis=0).tolist()
+    net_p50                         = np.percentile(nets, 50, axis=0).tolist()
+
     monthly = []
     for m in range(months):
         monthly.append({
             "month":     m + 1,
-            "spend_p10": round(float(np.percentile(totals[:, m], 10)), 2),
-            "spend_p50": round(float(np.percentile(totals[:, m], 50)), 2),
-            "spend_p90": round(float(np.percentile(totals[:, m], 90)), 2),
-            "net_p50":   round(float(np.percentile(nets[:, m], 50)), 2),
+            "spend_p10": round(spend_p10[m], 2),
+            "spend_p50": round(spend_p50[m], 2),
+            "spend_p90": round(spend_p90[m], 2),
+            "net_p50":   round(net_p50[m], 2),
         })
 
     avg_spend   = float(np.mean(totals))
@@ -151,7 +180,7 @@ def run_projection(df: pd.DataFrame, months: int = 12, scenario: dict = None) ->
 # STEP 4: STRESS TEST
 ####################################
 
-def stress_test(df: pd.DataFrame, scenario: str = "job_loss") -> dict:
+def stress_test(df: pd.DataFrame, scenario: str = "job_loss", pivot: pd.DataFrame = None) -> dict:
     """
     Preset stress scenarios.
 
@@ -159,7 +188,7 @@ def stress_test(df: pd.DataFrame, scenario: str = "job_loss") -> dict:
       -> {"months_of_runway": 8.3, "runway_ci": {"p10": 6.1, "p90": 11.2}, "categories_to_cut": [...]}
     """
 
-    distributions = _build_distributions(df)
+    distributions = _build_distributions(df, pivot)
 
     if not distributions:
         return {"error": "Not enough spending data"}
@@ -168,24 +197,33 @@ def stress_test(df: pd.DataFrame, scenario: str = "job_loss") -> dict:
     if scenario == "job_loss":
 
         # estimated savings = what's been accumulated over the data period
-        income_mask = df["category"].fillna("").str.lower() == "income"
-        spend_mask  = ~df["category"].fillna("").str.lower().isin(["income", "transfer", ""])
+        income_mask, spend_mask = _category_masks(df)
 
         estimated_savings = max(0.0,
-            float(df[income_mask]["amount"].sum()) - float(df[spend_mask]["amount"].sum())
+            float(df["amount"][income_mask].sum()) - float(df["amount"][spend_mask].sum())
         )
 
         # MC: how many months until cumulative spending exceeds savings?
+        # simulated a block at a time — low-savings runs stop after the first block
+        # instead of drawing all 36 months for paths that ran dry long ago
         months_sim = 36
-        totals     = _simulate(distributions, months_sim)  # (N_SIMS, months)
-        cumulative = np.cumsum(totals, axis=1)             # (N_SIMS, months)
+        runways    = np.full(N_SIMS, months_sim, dtype=float)
+        spent      = np.zeros(N_SIMS, dtype=np.float32)
 
-        runways = []
-        for sim in range(N_SIMS):
-            exceeded = np.where(cumulative[sim] > estimated_savings)[0]
-            runways.append(int(exceeded[0]) if len(exceeded) else months_sim)
+        for start in range(0, months_sim, RUNWAY_BLOCK):
+            totals      = _simulate(distributions, min(RUNWAY_BLOCK, months_sim - start))  # (N_SIMS, block)
+            cumulative  = np.cumsum(totals, axis=1, out=totals)                             # reuses the totals buffer
+            cumulative += spent[:, None]
 
-        runways = np.array(runways, dtype=float)
+            # first month each still-solvent sim runs dry (argmax of the bool row)
+            exceeded = cumulative > estimated_savings
+            ran_dry  = exceeded.any(axis=1) & (runways == months_sim)
+            runways[ran_dry] = start + exceeded[ran_dry].argmax(axis=1)
+
+            if (runways < months_sim).all():
+                break
+
+            spent = cumulative[:, -1]
 
         # discretionary to cut, sorted by monthly spend
         categories_to_cut = sorted(
@@ -206,12 +244,15 @@ def stress_test(df: pd.DataFrame, scenario: str = "job_loss") -> dict:
             if cat.lower() in ESSENTIAL_CATEGORIES
         )
 
+        # p10 / median / p90 from one selection pass over the runways
+        runway_p10, runway_p50, runway_p90 = np.percentile(runways, [10, 50, 90]).tolist()
+
         return {
             "scenario":               "job_loss",
-            "months_of_runway":       round(float(np.median(runways)), 1),
+            "months_of_runway":       round(runway_p50, 1),
             "runway_ci":              {
-                "p10": round(float(np.percentile(runways, 10)), 1),
-                "p90": round(float(np.percentile(runways, 90)), 1),
+                "p10": round(runway_p10, 1),
+                "p90": round(runway_p90, 1),
             },
             "estimated_savings":      round(estimated_savings, 2),
             "minimum_monthly_budget": round(min_budget, 2),
@@ -256,14 +297,14 @@ def calculate_runway(df: pd.DataFrame) -> dict:
     if "category" not in df.columns:
         return {"months_of_runway": None, "reason": "No category data"}
 
-    income_mask = df["category"].fillna("").str.lower() == "income"
-    spend_mask  = ~df["category"].fillna("").str.lower().isin(["income", "transfer", ""])
+    income_mask, spend_mask = _category_masks(df)
 
     if not income_mask.any():
         return {"months_of_runway": None, "reason": "No income detected"}
 
-    total_income      = float(df[income_mask]["amount"].sum())
-    total_spending    = float(df[spend_mask]["amount"].sum())
+    # mask the amount column, not the frame — df[mask]["amount"] copies every column first
+    total_income      = float(df["amount"][income_mask].sum())
+    total_spending    = float(df["amount"][spend_mask].sum())
     estimated_savings = max(0.0, total_income - total_spending)
 
     n_months       = max(1, int(df["date"].dt.to_period("M").nunique()))
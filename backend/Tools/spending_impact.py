@@ -14,7 +14,11 @@ tautological — R² is always ~1.0 when the target IS the sum of the features.
 Replaced with direct std ranking which is what the regression was measuring anyway.
 """
 
+import numpy as np
 import pandas as pd
+from operator import itemgetter
+
+from Tools.monthly_totals import monthly_category_totals
 
 
 
@@ -22,7 +26,7 @@ import pandas as pd
 # STEP 1: FIT IMPACT MODEL
 ####################################
 
-def fit_impact_model(df: pd.DataFrame) -> dict:
+def fit_impact_model(df: pd.DataFrame, pivot: pd.DataFrame = None) -> dict:
 
     dates = df["date"]
 
@@ -32,23 +36,17 @@ def fit_impact_model(df: pd.DataFrame) -> dict:
         return {"model_valid": False, "reason": f"Need 6+ months, have {span_days} days"}
 
 
-    # skip income/transfer
-    spend_df = df[~df["category"].fillna("").str.lower().isin(["income", "transfer", ""])].copy()
-    spend_df["month"] = spend_df["date"].dt.to_period("M")
-
-    # monthly totals per category
-    pivot = spend_df.pivot_table(
-        index      = "month",
-        columns    = "category",
-        values     = "amount",
-        aggfunc    = "sum",
-        fill_value = 0,
-    )
+    # monthly totals per category, income/transfer excluded (the orchestrator passes one shared build)
+    if pivot is None:
+        pivot = monthly_category_totals(df)
 
     if len(pivot) < 6:
         return {"model_valid": False, "reason": f"Only {len(pivot)} months with data — need 6+"}
 
-    categories = [c for c in pivot.columns if pivot[c].sum() > 0]
+    # every column's total in one reduction over contiguous category rows
+    # (same summation order as pivot[c].sum() per column)
+    has_spend  = np.ascontiguousarray(pivot.to_numpy(dtype=float).T).sum(axis=1) > 0
+    categories = pivot.columns[has_spend].tolist()
     if len(categories) < 3:
         return {"model_valid": False, "reason": "Need 3+ spending categories"}
 
@@ -61,8 +59,11 @@ def fit_impact_model(df: pd.DataFrame) -> dict:
     #
     # we use monthly_std directly — this measures how many dollars each category
     # swings month-to-month, which is what users actually care about.
-    means = pivot[categories].mean()
-    stds  = pivot[categories].std()
+    # one column subset shared by both reductions instead of selecting it twice
+    # (.agg(["mean", "std"]) would go column by column and shift the last bits)
+    spend = pivot.loc[:, has_spend]
+    means = spend.mean()
+    stds  = spend.std()
 
     total_std = stds.sum()
 
@@ -70,19 +71,19 @@ def fit_impact_model(df: pd.DataFrame) -> dict:
         return {"model_valid": False, "reason": "No spending variance detected"}
 
     impacts = []
-    for cat in categories:
-        pct = (stds[cat] / total_std) * 100
-        cv  = stds[cat] / means[cat] if means[cat] > 0 else 0.0
+    for cat, mean, std in zip(categories, means.to_numpy(), stds.to_numpy()):
+        pct = (std / total_std) * 100
+        cv  = std / mean if mean > 0 else 0.0
 
         impacts.append({
             "category":    cat,
             "impact_pct":  round(float(pct), 1),
-            "monthly_std": round(float(stds[cat]), 2),
-            "monthly_avg": round(float(means[cat]), 2),
+            "monthly_std": round(float(std), 2),
+            "monthly_avg": round(float(mean), 2),
             "cv":          round(float(cv), 3),
         })
 
-    impacts.sort(key=lambda x: x["impact_pct"], reverse=True)
+    impacts.sort(key=itemgetter("impact_pct"), reverse=True)
 
     confidence = calculate_impact_confidence(len(pivot))
 
@@ -6,9 +6,16 @@ Find recurring charges, track price creep, detect subscription overlap
 
   detect_price_creep(df, "NETFLIX")
   -> {"original_price": 15.99, "current_price": 22.99, "total_increase_pct": 43.7}
+
+  detect_price_creep_all(df, recurring)
+  -> [detect_price_creep(...) for each recurring merchant, in the same order]
 """
 
+import numpy as np
 import pandas as pd
+from operator import itemgetter
+
+from Ingestion.normalizer import ensure_datetime
 
 
 
@@ -19,6 +26,29 @@ import pandas as pd
 # categories where regular purchases are habits, not subscriptions
 HABIT_CATEGORIES = {"dining", "groceries", "delivery", "shopping", "transport"}
 
+DAY_NS = 86_400_000_000_000
+
+
+def _mean_std(values: np.ndarray) -> tuple:
+    """
+    (mean, sample std) skipping NaN — the same two-pass, zero-filled arithmetic
+    Series.mean() / Series.std() run, so results match them to the last bit.
+    """
+
+    missing = np.isnan(values)
+    count   = values.size - int(missing.sum())
+    filled  = np.where(missing, 0.0, values)
+
+    if count == 0:
+        return np.nan, np.nan
+
+    mean = filled.sum() / count
+    sqr  = (mean - filled) ** 2
+    sqr[missing] = 0.0
+
+    std = np.sqrt(sqr.sum() / (count - 1)) if count > 1 else np.nan
+    return mean, std
+
 
 def detect_recurring_charges(df: pd.DataFrame) -> list:
     """
@@ -29,29 +59,42 @@ def detect_recurring_charges(df: pd.DataFrame) -> list:
 
     results = []
 
-    for merchant, group in df.groupby("merchant"):
+    # one stable sort by merchant code — every merchant becomes a contiguous slice of
+    # plain arrays, so the checks below never build a pandas object per group
+    codes, merchants = pd.factorize(df["merchant"], sort=True)   # NaN merchant -> -1, dropped like groupby
 
-        if len(group) < 2:
-            continue
+    # one-off merchants (usually most of them) can't recur — drop them, and NaN merchants,
+    # before sorting so only repeat merchants are ever sorted or scanned
+    counts     = np.bincount(codes + 1, minlength=len(merchants) + 1)   # slot 0 = NaN merchants
+    repeats    = np.flatnonzero((codes >= 0) & (counts[codes + 1] >= 2))
+    order      = repeats[np.argsort(codes[repeats], kind="stable")]
+    codes      = codes[order]
+    amounts    = df["amount"].to_numpy(dtype=float)[order]
+    dates      = ensure_datetime(df["date"]).to_numpy(dtype="datetime64[ns]")[order]
+    categories = df["category"].to_numpy()[order] if "category" in df.columns else None
+    starts     = np.flatnonzero(np.diff(codes, prepend=-1))   # codes are >= 0 here, so row 0 always starts
+    ends       = np.append(starts[1:], len(codes))
+
+    for start, end in zip(starts, ends):
 
-        group_dates   = group["date"].sort_values()
-        group_amounts = group["amount"].astype(float)
+        merchant = merchants[codes[start]]
 
         # check if amounts are consistent (std < 35% of mean)
         # relaxed from 20% to catch tiered/usage-based subscriptions
         # (e.g. phone bills that vary $40-55, cloud services with usage tiers)
-        mean_amount = group_amounts.mean()
+        mean_amount, amount_std = _mean_std(amounts[start:end])
         if mean_amount < 3:
             continue
 
-        amount_std = group_amounts.std()
         if mean_amount > 0 and (amount_std / mean_amount) > 0.35:
             continue
 
-        # check interval regularity
-        gaps     = group_dates.diff().dt.days.dropna()
-        avg_gap  = gaps.mean()
-        gap_std  = gaps.std() if len(gaps) > 1 else 0
+        # check interval regularity — whole days between consecutive charges
+        group_dates = np.sort(dates[start:end])
+        group_dates = group_dates[~np.isnat(group_dates)]
+        gaps        = (np.diff(group_dates.view("i8")) // DAY_NS).astype(float)
+        avg_gap, gap_std = _mean_std(gaps)
+        gap_std     = gap_std if len(gaps) > 1 else 0
 
         # monthly: avg gap 25-35 days, low variance
         if 25 <= avg_gap <= 35 and gap_std < 5:
@@ -63,7 +106,7 @@ def detect_recurring_charges(df: pd.DataFrame) -> list:
         else:
             continue
 
-        cat = group["category"].iloc[0] if "category" in group.columns else "Subscriptions"
+        cat = categories[start] if categories is not None else "Subscriptions"
 
         # filter out habitual purchases masquerading as subscriptions
         # someone buying Starbucks every ~30 days is a habit, not a subscription.
@@ -81,11 +124,12 @@ def detect_recurring_charges(df: pd.DataFrame) -> list:
             # (e.g. Starbucks $4.50, $5.25, $6.10 — not a subscription)
             continue
 
-        # day of month (most common)
-        day_of_month = int(group_dates.dt.day.mode().iloc[0])
+        # day of month (most common, earliest day on ties)
+        days         = (group_dates.astype("datetime64[D]") - group_dates.astype("datetime64[M]")).astype(int) + 1
+        day_of_month = int(np.bincount(days).argmax())
 
         # confidence based on number of cycles and amount consistency
-        n_cycles = len(group)
+        n_cycles = int(end - start)
 
         if n_cycles >= 3 and amount_cv <= 0.05:
             confidence = 0.95     # exact same amount = almost certainly a subscription
@@ -111,7 +155,7 @@ def detect_recurring_charges(df: pd.DataFrame) -> list:
         })
 
     # sort by annual cost descending
-    results.sort(key=lambda x: x["annual_cost"], reverse=True)
+    results.sort(key=itemgetter("annual_cost"), reverse=True)
 
     total_annual = sum(r["annual_cost"] for r in results)
     total_monthly = sum(r["amount"] for r in results if r["frequency"] == "monthly")
@@ -133,17 +177,20 @@ def detect_price_creep(df: pd.DataFrame, merchant: str) -> dict:
     Only meaningful if merchant has 3+ charges over 3+ months
     """
 
-    merchant_df    = df[df["merchant"].str.upper() == merchant.upper()].copy()
-    merchant_df["date"] = pd.to_datetime(merchant_df["date"])
-    merchant_df    = merchant_df.sort_values("date")
+    # only the two columns used — no filtered copy of the whole frame
+    is_merchant = df["merchant"].str.upper() == merchant.upper()
+    merchant_df = pd.DataFrame({
+        "date":   ensure_datetime(df["date"][is_merchant]),
+        "amount": df["amount"][is_merchant],
+    }).sort_values("date")
 
     if len(merchant_df) < 3:
         return {"merchant": merchant, "price_creep_detected": False, "reason": "Not enough history"}
 
 
     # group by month, take the charge amount per month
-    merchant_df["month"] = merchant_df["date"].dt.to_period("M")
-    monthly = merchant_df.groupby("month")["amount"].mean()
+    months  = merchant_df["date"].dt.to_period("M").rename("month")
+    monthly = merchant_df["amount"].groupby(months).mean()
 
     price_history = [
         {"month": str(p), "amount": round(float(v), 2)}
@@ -175,6 +222,18 @@ def detect_price_creep(df: pd.DataFrame, merchant: str) -> dict:
     }
 
 
+def detect_price_creep_all(df: pd.DataFrame, recurring: list) -> list:
+    """Price creep for every recurring merchant — one result per entry of recurring."""
+
+    # split rows by merchant once — each price-creep check then scans only its
+    # own merchant's rows instead of uppercasing the whole frame again
+    merchant_upper = df["merchant"].str.upper()
+    is_recurring   = merchant_upper.isin({r["merchant"].upper() for r in recurring})
+    by_merchant    = dict(list(df[is_recurring].groupby(merchant_upper[is_recurring].to_numpy())))
+
+    return [detect_price_creep(by_merchant[r["merchant"].upper()], r["merchant"]) for r in recurring]
+
+
 
 ####################################
 # STEP 3: DETECT SUBSCRIPTION OVERLAP
@@ -273,6 +332,6 @@ def detect_subscription_overlap(recurring: list) -> list:
             "potential_savings": potential_savings,
         })
 
-    overlaps.sort(key=lambda x: x["combined_annual"], reverse=True)
+    overlaps.sort(key=itemgetter("combined_annual"), reverse=True)
 
     return overlaps
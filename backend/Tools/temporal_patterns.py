@@ -11,6 +11,8 @@ Detect payday spikes, weekly cycles, and seasonal patterns
 import pandas as pd
 import numpy as np
 
+from Ingestion.normalizer import category_in
+
 
 
 ####################################
@@ -25,7 +27,7 @@ def detect_payday_pattern(df: pd.DataFrame) -> dict:
 
     # find the income transaction
     if "category" in df.columns:
-        income_mask = df["category"].fillna("").str.lower() == "income"
+        income_mask = category_in(df["category"], {"income"})
     else:
         return {"payday_detected": False, "reason": "No category data — cannot identify income deposits"}
 
@@ -51,7 +53,7 @@ def detect_payday_pattern(df: pd.DataFrame) -> dict:
 
     # spending = everything that's NOT income/transfer
     if "category" in df.columns:
-        spend_mask = ~df["category"].fillna("").str.lower().isin(["income", "transfer"])
+        spend_mask = ~category_in(df["category"], {"income", "transfer"})
     else:
         spend_mask = ~income_mask
 
@@ -116,7 +118,7 @@ def detect_weekly_pattern(df: pd.DataFrame) -> dict:
 
     # filter to spending only
     if "category" in df.columns:
-        mask    = ~df["category"].fillna("").str.lower().isin(["income", "transfer"])
+        mask    = ~category_in(df["category"], {"income", "transfer"})
         dates   = dates[mask]
         amounts = amounts[mask]
 
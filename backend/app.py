@@ -15,6 +15,7 @@ import time
 import uuid
 import json
 import queue
+import logging
 import threading
 import pandas as pd
 from flask import Flask, request, jsonify, Response
@@ -25,6 +26,13 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# library modules log instead of print — route them to stdout once, here
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(message)s", stream=sys.stdout)
+
+# provider SDKs log every request at INFO ("HTTP Request: POST ...") — keep those quiet
+for noisy in ("httpx", "httpcore"):
+    logging.getLogger(noisy).setLevel(logging.WARNING)
+
 sys.path.insert(0, os.path.dirname(__file__))  # allows `python app.py` without pip install -e .
 
 from Ingestion.format_detector       import detect_csv_format, validate_csv_structure, normalize_to_standard
@@ -107,10 +115,12 @@ def _auto_categorize_with_llm(df: pd.DataFrame, progress_callback=None) -> pd.Da
 
     try:
         llm_results = batch_categorize_llm(uncategorized_merchants)
-        for _, row in llm_results.iterrows():
-            merchant_mask = df["merchant"] == row["merchant"]
-            df.loc[merchant_mask, "category"] = row["category"]
-            df.loc[merchant_mask, "confidence"] = LLM_DEFAULT_CONFIDENCE
+
+        # one pass over df for all merchants instead of a full-frame mask per merchant
+        llm_categories = dict(zip(llm_results["merchant"], llm_results["category"]))
+        matched = df["merchant"].isin(llm_categories.keys())
+        df.loc[matched, "category"]   = df.loc[matched, "merchant"].map(llm_categories)
+        df.loc[matched, "confidence"] = LLM_DEFAULT_CONFIDENCE
 
         still_uncategorized = df["category"].fillna("").eq("") | df["category"].isna()
         newly_categorized = uncategorized_mask & ~still_uncategorized
@@ -203,10 +213,11 @@ def _ingest_csv(content: str, rules: dict, merchant_db: dict) -> tuple:
     """
 
     format_type = detect_csv_format(io.StringIO(content))
-    df_raw      = pd.read_csv(io.StringIO(content))
+    # stop parsing one row past the limit — oversized uploads are rejected without a full parse
+    df_raw      = pd.read_csv(io.StringIO(content), nrows=MAX_ROWS + 1)
 
     if len(df_raw) > MAX_ROWS:
-        raise ValueError(f"CSV too large ({len(df_raw)} rows). Maximum is {MAX_ROWS} rows.")
+        raise ValueError(f"CSV too large (over {MAX_ROWS} rows). Maximum is {MAX_ROWS} rows.")
 
     validate_csv_structure(df_raw, format_type)
     df = normalize_to_standard(df_raw, format_type)
@@ -222,27 +233,37 @@ def _ingest_csv(content: str, rules: dict, merchant_db: dict) -> tuple:
     df["confidence"] = result["confidence"].values
 
     # check in-memory merchant cache for uncategorized
+    # one lookup per distinct merchant, then fill rows with a vectorized map
+    missing = df["category"].isna()
+    cached_cat, cached_conf = {}, {}
     with _merchant_lock:
-        for i, row in df[df["category"].isna()].iterrows():
-            cat, conf, _ = lookup_merchant(row["merchant"], db=merchant_db)
+        for merchant in df.loc[missing, "merchant"].unique():
+            cat, conf, _ = lookup_merchant(merchant, db=merchant_db)
             if cat:
-                df.at[i, "category"]   = cat
-                df.at[i, "confidence"] = conf
+                cached_cat[merchant]  = cat
+                cached_conf[merchant] = conf
+
+    if cached_cat:
+        fill = missing & df["merchant"].isin(cached_cat.keys())
+        df.loc[fill, "category"]   = df.loc[fill, "merchant"].map(cached_cat)
+        df.loc[fill, "confidence"] = df.loc[fill, "merchant"].map(cached_conf)
 
     # split: categorized vs needs LLM
     needs_llm_count = df[df["category"].isna() | (df["confidence"] < RECAT_THRESHOLD)]["merchant"].nunique()
     categorized     = int(df["category"].notna().sum())
 
     # update in-memory cache + persist to disk
-    changed = False
+    changed   = False
+    confident = df[df["confidence"] >= CACHE_THRESHOLD]
+    today     = pd.Timestamp.now().strftime("%Y-%m-%d")
     with _merchant_lock:
-        for _, row in df[df["confidence"] >= CACHE_THRESHOLD].iterrows():
-            key = row["merchant"].upper()
+        for merchant, category, confidence in zip(confident["merchant"], confident["category"], confident["confidence"]):
+            key = merchant.upper()
             if key not in merchant_db or not merchant_db.get(key, {}).get("user_verified"):
                 merchant_db[key] = {
-                    "category":      row["category"],
-                    "confidence":    float(row["confidence"]),
-                    "last_verified": pd.Timestamp.now().strftime("%Y-%m-%d"),
+                    "category":      category,
+                    "confidence":    float(confidence),
+                    "last_verified": today,
                     "user_verified": False,
                 }
                 changed = True
@@ -0,0 +1,218 @@
+"""
+Unit tests for the LLM client helpers — no network, call_llm is stubbed.
+
+Run: cd backend && python -m pytest tests/test_llm_client.py -v
+"""
+
+import os
+import sys
+import json
+import time
+import timeit
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import LLM.client as client
+import Categorization.llm_categorizer as llm_categorizer
+from LLM.client import call_llm_batch
+from Categorization.llm_categorizer import batch_categorize_llm
+
+
+# ─── FIXTURES ───────────────────────────────────────────────
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Replace call_llm with a stub that records prompts and returns queued responses."""
+    calls     = []
+    responses = []
+
+    def _fake(prompt, temperature=0.0, max_tokens=500, model=None):
+        calls.append(prompt)
+        return responses.pop(0)
+
+    monkeypatch.setattr(client, "call_llm", _fake)
+    return calls, responses
+
+
+# ─── BATCHED CALLS ─────────────────────────────────────────
+
+def test_batch_packs_prompts_into_one_call(fake_llm):
+    calls, responses = fake_llm
+    responses.append('```json\n["Dining", "Groceries"]\n```')
+
+    result = call_llm_batch(["Categorize: STARBUCKS", "Categorize: LOBLAWS"])
+
+    assert len(calls) == 1
+    assert result == ["Dining", "Groceries"]
+
+
+def test_batch_respects_batch_size(fake_llm):
+    calls, responses = fake_llm
+    responses.extend(['["a", "b"]', '["c"]'])
+
+    result = call_llm_batch(["1", "2", "3"], batch_size=2)
+
+    assert len(calls) == 2
+    assert result == ["a", "b", "c"]
+
+
+def test_batch_serializes_object_answers(fake_llm):
+    _, responses = fake_llm
+    responses.append('[{"category": "Dining"}]')
+
+    result = call_llm_batch(["Categorize: STARBUCKS"])
+
+    assert json.loads(result[0]) == {"category": "Dining"}
+
+
+def test_batch_count_mismatch_returns_none(fake_llm):
+    """If the model drops an answer, positions can't be trusted."""
+    _, responses = fake_llm
+    responses.append('["Dining"]')
+
+    result = call_llm_batch(["x", "y"])
+
+    assert result == [None, None]
+
+
+# ─── CATEGORIZER FALLBACK ──────────────────────────────────
+
+def test_fallback_accepts_bare_categories_and_retries_the_rest(fake_llm, monkeypatch):
+    """List prompt misses everyone -> packed answers are bare names or junk; junk gets its own call."""
+    calls, responses = fake_llm
+    monkeypatch.setattr(llm_categorizer, "call_llm", client.call_llm)
+    responses.extend([
+        "[]",                                      # list prompt: nothing
+        '["Dining", "Groceries", "no idea"]',      # packed fallback
+        '{"category": "Transport"}',               # own call for PRESTO
+    ])
+
+    result = batch_categorize_llm(["STARBUCKS", "LOBLAWS", "PRESTO"])
+
+    assert len(calls) == 3
+    assert result["category"].tolist() == ["Dining", "Groceries", "Transport"]
+
+
+# ─── RESPONSE CACHE ────────────────────────────────────────
+
+@pytest.fixture
+def cached_provider(monkeypatch, tmp_path):
+    """Point the cache at a temp file and swap in a counting fake provider."""
+    calls = []
+
+    def _fake(prompt, model, temperature, max_tokens):
+        calls.append(prompt)
+        return f"answer {len(calls)}"
+
+    monkeypatch.setattr(client, "CACHE_ENABLED", True)
+    monkeypatch.setattr(client, "CACHE_PATH", str(tmp_path / "llm.sqlite"))
+    monkeypatch.setattr(client, "_cache_conn", None)
+    monkeypatch.setattr(client, "_provider", "ollama")
+    monkeypatch.setattr(client, "_default_model", "test-model")
+    monkeypatch.setattr(client, "_call_fn", _fake)
+    return calls
+
+
+def test_deterministic_calls_hit_cache(cached_provider):
+    first  = client.call_llm("Categorize: NETFLIX")
+    second = client.call_llm("Categorize: NETFLIX")
+
+    assert first == second == "answer 1"
+    assert len(cached_provider) == 1
+
+
+def test_sampled_calls_bypass_cache(cached_provider):
+    client.call_llm("Write a tip", temperature=0.7)
+    client.call_llm("Write a tip", temperature=0.7)
+
+    assert len(cached_provider) == 2
+
+
+def test_unopenable_cache_disables_itself(cached_provider, monkeypatch, tmp_path):
+    """A bad cache path is tried once, then the cache stays off for the session."""
+    (tmp_path / "not_a_dir").write_text("")
+    monkeypatch.setattr(client, "CACHE_PATH", str(tmp_path / "not_a_dir" / "llm.sqlite"))
+
+    client.call_llm("Categorize: NETFLIX")
+    client.call_llm("Categorize: NETFLIX")
+
+    assert len(cached_provider) == 2
+    assert client.CACHE_ENABLED is False
+
+
+# ─── JSON EXTRACTION ───────────────────────────────────────
+
+def test_extract_json_fenced_block():
+    assert client.extract_json('```json\n{"a": 1}\n```') == '{"a": 1}'
+
+
+def test_extract_json_ignores_trailing_text():
+    assert client.extract_json('[{"a": 1}]\n\nSome explanation.') == '[{"a": 1}]'
+
+
+def test_extract_json_skips_invalid_opener():
+    assert client.extract_json('Note [see below] {"a": 1}') == '{"a": 1}'
+
+
+def test_extract_json_empty():
+    assert client.extract_json(None) == "{}"
+
+
+def test_extract_json_brackets_inside_strings():
+    assert client.extract_json('{"reason": "closes with } early"} trailing') == '{"reason": "closes with } early"}'
+
+
+def test_extract_json_unclosed_fence():
+    assert client.extract_json('```json\n{"a": 1}') == '{"a": 1}'
+
+
+def test_extract_json_unbalanced_input_is_linear():
+    """Unclosed openers must not rescan the tail once per opener — 4x the input, ~4x the time."""
+    assert client.extract_json("{" * 2_000) == "{" * 2_000
+
+    # best of several runs on n and 4n, compared as a ratio, so a slow box can't flake it
+    def best(n):
+        return min(timeit.repeat(lambda: client.extract_json("{" * n), number=1, repeat=5))
+
+    assert best(8_000) / best(2_000) < 8      # linear ~4, quadratic ~16
+
+
+# ─── COST GUARD ────────────────────────────────────────────
+
+def test_cost_guard_aborts_before_sending(cached_provider, monkeypatch):
+    """A prompt that would push the session past COST_ABORT never reaches the provider."""
+    monkeypatch.setattr(client, "_default_model", "claude-sonnet-4-6")
+    monkeypatch.setattr(client, "_session_cost", client.COST_ABORT - 0.001)
+
+    with pytest.raises(RuntimeError):
+        client.call_llm("x" * 10_000, temperature=0.7)
+
+    assert cached_provider == []
+
+
+# ─── CONCURRENCY ───────────────────────────────────────────
+
+def test_usage_tracking_is_thread_safe(monkeypatch):
+    """Categorization fans calls out over a pool — no increments may be lost."""
+    monkeypatch.setattr(client, "_session_cost", 0.0)
+    monkeypatch.setattr(client, "_session_tokens", 0)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: client._track_usage(10, 5, "gpt-4o-mini"), range(2000)))
+
+    assert client._session_tokens == 2000 * 15
+
+
+def test_rate_limit_spaces_concurrent_calls(cached_provider, monkeypatch):
+    """With MAX_RPM set, parallel callers are spaced 60 / MAX_RPM seconds apart."""
+    monkeypatch.setattr(client, "MAX_RPM", 1200)      # one request per 50ms
+    monkeypatch.setattr(client, "_next_slot", 0.0)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda i: client.call_llm(f"tip {i}", temperature=0.7), range(5)))
+
+    assert len(cached_provider) == 5
+    assert time.monotonic() - start >= 0.2
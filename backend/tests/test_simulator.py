@@ -12,7 +12,8 @@ import numpy as np
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from Tools.simulator import run_projection, stress_test, calculate_runway
+import Tools.simulator as simulator
+from Tools.simulator import run_projection, stress_test, calculate_runway, _simulate
 
 
 # ─── FIXTURES ───────────────────────────────────────────────
@@ -104,6 +105,51 @@ def test_short_data_projection(short_df):
     assert "monthly" in result or "error" in result
 
 
+def test_pooled_categories_keep_total_spread():
+    """Fixed bills get pooled into one draw — total mean and std must not move."""
+    dists  = {
+        "Rent":      {"mean": 1500.0, "std": 1.0},
+        "Phone":     {"mean": 80.0,   "std": 2.0},
+        "Insurance": {"mean": 200.0,  "std": 10.0},
+    }
+    totals = _simulate(dists, 12)
+
+    assert totals.shape == (1000, 12)
+    assert totals.mean() == pytest.approx(1780.0, abs=2.0)
+    assert totals.std() == pytest.approx(np.sqrt(1.0 + 4.0 + 100.0), rel=0.1)
+
+
+def test_pooled_draws_match_unpooled(monkeypatch):
+    """Fixed bills pooled next to volatile, clipped categories — totals match drawing each one alone."""
+    dists = {
+        "Rent":      {"mean": 2000.0, "std": 300.0},   # mean >= 5 std -> pooled
+        "Insurance": {"mean": 500.0,  "std": 90.0},
+        "Phone":     {"mean": 100.0,  "std": 20.0},
+        "Dining":    {"mean": 300.0,  "std": 100.0},   # drawn on its own
+        "Shopping":  {"mean": 150.0,  "std": 200.0},   # clipped at 0 often
+    }
+
+    # seed the per-call generator and record how many columns each run draws
+    widths = []
+
+    class Recording(np.random.Generator):
+        def standard_normal(self, size=None, dtype=np.float64, out=None):
+            widths.append(size[-1])
+            return super().standard_normal(size, dtype=dtype, out=out)
+
+    seeded = np.random.SFC64
+    monkeypatch.setattr(np.random, "Generator", Recording)
+    monkeypatch.setattr(np.random, "SFC64", lambda: seeded(7))
+
+    pooled = _simulate(dists, 12)
+    monkeypatch.setattr(simulator, "POOL_SIGMAS", np.inf)
+    unpooled = _simulate(dists, 12)
+
+    assert widths == [3, 5]
+    assert pooled.mean() == pytest.approx(unpooled.mean(), abs=15.0)
+    assert pooled.std() == pytest.approx(unpooled.std(), rel=0.05)
+
+
 # ─── STRESS TEST TESTS ─────────────────────────────────────
 
 def test_stress_job_loss_returns_runway(sample_df):
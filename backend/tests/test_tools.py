@@ -6,6 +6,7 @@ Run: cd backend && python -m pytest tests/test_tools.py -v
 
 import os
 import sys
+import warnings
 import pytest
 import pandas as pd
 import numpy as np
@@ -13,12 +14,13 @@ import numpy as np
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 from Tools.anomaly_detector       import detect_transaction_outliers, detect_spending_spikes, detect_new_merchants
-from Tools.subscription_hunter    import detect_recurring_charges, detect_price_creep, detect_subscription_overlap
+from Tools.subscription_hunter    import detect_recurring_charges, detect_price_creep, detect_price_creep_all, detect_subscription_overlap
 from Tools.spending_impact        import fit_impact_model
+from Tools.monthly_totals         import monthly_category_totals
 from Tools.temporal_patterns      import detect_payday_pattern, detect_weekly_pattern, detect_seasonal_pattern
-from Tools.behavioral_correlation import calculate_category_correlations
+from Tools.behavioral_correlation import calculate_category_correlations, _benjamini_hochberg
 from Categorization.rule_categorizer import build_rule_engine, categorize_merchant
-from Ingestion.normalizer         import clean_merchant_name, deduplicate_transactions
+from Ingestion.normalizer         import clean_merchant_name, deduplicate_transactions, category_in
 
 
 # ─── FIXTURES ───────────────────────────────────────────────
@@ -126,6 +128,11 @@ class TestSubscriptionDetection:
         assert result["price_creep_detected"] is True
         assert result["current_price"] > result["original_price"]
 
+    def test_price_creep_all_matches_per_merchant(self, sample_df):
+        """One merchant split for every recurring charge — same results as one call each."""
+        recurring = detect_recurring_charges(sample_df)
+        assert detect_price_creep_all(sample_df, recurring) == [detect_price_creep(sample_df, r["merchant"]) for r in recurring]
+
 
 # ─── SPENDING IMPACT ───────────────────────────────────────
 
@@ -162,6 +169,20 @@ class TestSpendingImpact:
         result = fit_impact_model(short_df)
         assert result["model_valid"] is False
 
+    def test_shared_pivot_matches_own_build(self, sample_df):
+        """Passing the orchestrator's pivot gives the same result as building it."""
+        pivot = monthly_category_totals(sample_df)
+        assert "Income" not in pivot.columns
+        assert fit_impact_model(sample_df, pivot) == fit_impact_model(sample_df)
+
+    def test_monthly_totals_see_in_place_edits(self, sample_df):
+        """Rewriting a column in place (LLM recategorization) shows up in the next build."""
+        df     = sample_df.copy()
+        before = monthly_category_totals(df)
+
+        df.loc[df["category"] == "Dining", "amount"] *= 2
+        assert monthly_category_totals(df)["Dining"].sum() == pytest.approx(before["Dining"].sum() * 2)
+
 
 # ─── TEMPORAL PATTERNS ─────────────────────────────────────
 
@@ -254,6 +275,32 @@ class TestDeduplication:
         assert len(result) == 3  # all different enough to keep
 
 
+# ─── CORRELATION ────────────────────────────────────────────
+
+class TestCorrelation:
+
+    def test_bh_adjustment_reference_values(self):
+        """Step-up BH: p * n / rank, made monotone from the largest rank down."""
+        reject, adjusted = _benjamini_hochberg([0.01, 0.04, 0.03, 0.20], alpha=0.10)
+        assert np.allclose(adjusted, [0.04, 0.04 * 4 / 3, 0.04 * 4 / 3, 0.20])
+        assert reject.tolist() == [True, True, True, False]
+
+    def test_detects_co_moving_categories(self):
+        """Two categories that rise and fall together month to month should pair up."""
+        rng    = np.random.default_rng(0)
+        months = pd.date_range("2024-01-15", periods=12, freq="MS") + pd.Timedelta(days=14)
+        swing  = rng.uniform(100, 600, 12)
+        rows   = []
+        for d, s in zip(months, swing):
+            rows.append({"date": d, "amount": s, "merchant": "A", "category": "Dining"})
+            rows.append({"date": d, "amount": s * 0.5 + rng.uniform(0, 5), "merchant": "B", "category": "Delivery"})
+            rows.append({"date": d, "amount": rng.uniform(50, 150), "merchant": "C", "category": "Shopping"})
+
+        result = calculate_category_correlations(pd.DataFrame(rows))
+        pairs  = {(r["category_a"], r["category_b"]) for r in result}
+        assert ("Delivery", "Dining") in pairs
+
+
 # ─── EDGE CASES ─────────────────────────────────────────────
 
 class TestEdgeCases:
@@ -279,3 +326,26 @@ class TestEdgeCases:
         })
         result = detect_spending_spikes(df)
         assert result == []
+
+    def test_category_in_matches_lowercase_isin(self):
+        """NaN and "" count as the empty label, case is ignored, non-strings never match."""
+        cats   = pd.Series(["Income", "TRANSFER", None, "", "Dining", 5, "income "])
+        names  = {"income", "transfer", ""}
+        result = category_in(cats, names)
+        assert result.tolist() == cats.fillna("").str.lower().isin(names).tolist()
+        assert result.tolist() == [True, True, True, True, False, False, False]
+
+    def test_new_merchants_all_nan_amounts(self):
+        """A merchant with no amounts is skipped quietly; averages match groupby to the cent."""
+        df = pd.DataFrame({
+            "date":     pd.to_datetime(["2025-01-01", "2025-03-01", "2025-03-08", "2025-03-02", "2025-03-09"]),
+            "amount":   [20.0, np.nan, np.nan, 23.345, 23.355],
+            "merchant": ["OLD", "GHOST", "GHOST", "GYM", "GYM"],
+            "category": ["Dining"] * 5,
+        })
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            result = detect_new_merchants(df)
+
+        assert [r["merchant"] for r in result] == ["GYM"]
+        assert result[0]["avg_amount"] == round(df[df["merchant"] == "GYM"]["amount"].mean(), 2)